@@ -8,11 +8,13 @@ class Machine:
     def __init__(self):
         self.stack=[]
 
+    def compile(self, instructions):
+        # Bind each opcode to its method once, ahead of execution
+        return [(getattr(self, opcode), tuple(args)) for opcode, *args in instructions]
+
     def run(self, instructions):
-        for instruction in instructions:
-            opcode = instruction[0]
-            args = instruction[1:]
-            getattr(self, opcode)(*args)
+        for method, args in self.compile(instructions):
+            method(*args)
 
     def push(self, value):
         self.stack.append(value)
@@ -44,28 +46,75 @@ class Machine:
         print(self.pop())
 
 
+# Instructions without arguments are shared rather than rebuilt for
+# every node that emits them.
+_ADD = ('ADD',)
+_MUL = ('MUL',)
+_PRINT = ('PRINT',)
+
+_BINOPS = {
+    '+': _ADD,
+    '*': _MUL,
+}
+
+# The same goes for pushes of a constant that appears more than once
+_PUSHES = {}
+
+
+# Binary operators on two constants are folded into a single push
+_FOLDS = {
+    '+': lambda left, right: left + right,
+    '*': lambda left, right: left * right,
+}
+
+
+def _push(value, instructions):
+    instruction = _PUSHES.get(value)
+    if instruction is None:
+        instruction = _PUSHES[value] = ('push', value)
+    instructions.append(instruction)
+
+
+def _gen_integer(node, instructions):
+    _push(int(node.value), instructions)
+
+
+def _gen_binop(node, instructions):
+    generate_code(node.left, instructions)
+    generate_code(node.right, instructions)
+    if node.op in _BINOPS:
+        if (len(instructions) >= 2 and instructions[-2][0] == 'push'
+                and instructions[-1][0] == 'push'):
+            right = instructions.pop()[1]
+            left = instructions.pop()[1]
+            _push(_FOLDS[node.op](left, right), instructions)
+        else:
+            instructions.append(_BINOPS[node.op])
+
+
+def _gen_print(node, instructions):
+    generate_code(node.value, instructions)
+    instructions.append(_PRINT)
+
+
+def _gen_block(node, instructions):
+    for statement in node.statements:
+        generate_code(statement, instructions)
+
+
+_HANDLERS = {
+    Integer: _gen_integer,
+    BinOp: _gen_binop,
+    PrintStatement: _gen_print,
+    Block: _gen_block,
+}
+
+
 def generate_code(node, instructions):
-    if isinstance(node, Integer):
-        instructions.append(('push',int(node.value)))
-
-    elif isinstance(node, BinOp):
-        generate_code(node.left,instructions)
-        generate_code(node.right,instructions)
-        if node.op == '+':
-            instructions.append(('ADD',))
-        elif node.op == '*':
-            instructions.append(('MUL',))
-
-    elif isinstance(node, PrintStatement):
-        generate_code(node.value, instructions)
-        instructions.append(('PRINT',))
-
-    elif isinstance(node, Block):
-        for statement in node.statements:
-            generate_code(statement, instructions)
-
-    else:
+    handler = _HANDLERS.get(type(node))
+    if handler is None:
         raise RuntimeError(f"Can't generate code for {node}")
+    handler(node, instructions)
 
 
 program = parse_file(sys.argv[1])
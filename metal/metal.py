@@ -51,9 +51,179 @@
 # register.  All memory instructions take their address from register
 # plus an integer offset that's encoded as part of the instruction.
 
+import operator
+
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:
+    np = njit = None
+
 IO_OUT = 65535
 MASK = 0xffffffff
 
+OPCODES = ('ADD', 'SUB', 'MUL', 'INC', 'DEC', 'CMP', 'CONST',
+           'LOAD', 'STORE', 'JMP', 'BZ', 'HALT', 'JMP_ABS')
+
+# Opcode numbers used by the compiled machine
+OPCODE_IDS = { name: n for n, name in enumerate(OPCODES) }
+(OP_ADD, OP_SUB, OP_MUL, OP_INC, OP_DEC, OP_CMP, OP_CONST,
+ OP_LOAD, OP_STORE, OP_JMP, OP_BZ, OP_HALT, OP_JMP_ABS) = range(len(OPCODES))
+
+# The register file is a plain list.  Register names used in the
+# instructions are decoded into list indices before the program runs.
+REGISTERS = { f'R{d}': d for d in range(8) }
+REGISTERS['PC'] = PC = 8
+
+# Comparison operators are also decoded, into the function that
+# carries out the comparison.
+CMP_OPS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+}
+
+def decode(instructions):
+    '''
+    Translate register names such as 'R3' or 'PC' in each instruction
+    into indices of the register file and CMP operators into functions.
+    A BZ always executes with PC pointing at the next instruction, so
+    its branch offset is resolved into an absolute target here rather
+    than being added to PC each time the branch is taken.  Likewise, a
+    JMP through R0 always lands on its offset and becomes a JMP_ABS.
+    '''
+    decoded = []
+    for n, (op, *args) in enumerate(instructions):
+        args = [ REGISTERS.get(arg, arg) if isinstance(arg, str) else arg
+                 for arg in args ]
+        if op == 'BZ':
+            args[1] = n + 1 + args[1]
+        elif op == 'JMP' and args[0] == 0:
+            op, args = 'JMP_ABS', args[1:]
+        elif op == 'CMP':
+            if args[0] not in CMP_OPS:
+                raise RuntimeError(f'Bad comparison {args[0]}. Must be ==, !=, <, >, <=, >=')
+            args[0] = CMP_OPS[args[0]]
+        decoded.append((op, *args))
+    return decoded
+
+# Compiled execution.  If Numba is installed, programs are encoded into
+# parallel integer columns (opcode, a, b, c, imm) and executed by a
+# jitted loop over uint32 NumPy arrays instead of dispatching to the methods
+# of the Metal class below.
+
+CMP_FUNCS = tuple(CMP_OPS.values())
+
+def encode(instructions):
+    '''
+    Encode decoded instructions as columns (opcodes, a, b, c, imm),
+    one entry per instruction in each.
+    '''
+    code = ([], [], [], [], [])
+    for op, *args in instructions:
+        if op in {'ADD', 'SUB', 'MUL'}:
+            ra, rb, rd = args
+            row = (ra, rb, rd, 0)
+        elif op in {'INC', 'DEC'}:
+            ra, = args
+            row = (ra, 0, 0, 0)
+        elif op == 'CMP':
+            cmpop, ra, rb, rd = args
+            row = (ra, rb, rd, CMP_FUNCS.index(cmpop))
+        elif op == 'CONST':
+            value, rd = args
+            row = (0, 0, rd, value & MASK)
+        elif op in {'LOAD', 'STORE'}:
+            rs, rd, offset = args
+            row = (rs, rd, 0, offset)
+        elif op == 'JMP':
+            rd, offset = args
+            row = (rd, 0, 0, offset)
+        elif op == 'BZ':
+            rt, target = args
+            row = (rt, 0, 0, target)
+        elif op == 'JMP_ABS':
+            target, = args
+            row = (0, 0, 0, target)
+        elif op == 'HALT':
+            row = (0, 0, 0, 0)
+        else:
+            raise RuntimeError(f'Bad instruction {op}')
+        for column, value in zip(code, (OPCODE_IDS[op], *row)):
+            column.append(value)
+    return code
+
+def execute(opcodes, ca, cb, cc, cimm, registers, memory):
+    '''
+    Run encoded instructions until the machine halts (returns False)
+    or writes to IO_OUT (returns True).  Output is left for the caller
+    to print so that it appears as the program runs.
+    '''
+    while True:
+        pc = registers[PC]
+        op = opcodes[pc]
+        a = ca[pc]
+        b = cb[pc]
+        c = cc[pc]
+        imm = cimm[pc]
+        registers[PC] = pc + 1
+        if op == OP_ADD:
+            registers[c] = (registers[a] + registers[b]) & MASK
+        elif op == OP_SUB:
+            registers[c] = (registers[a] - registers[b]) & MASK
+        elif op == OP_MUL:
+            registers[c] = (registers[a] * registers[b]) & MASK
+        elif op == OP_INC:
+            registers[a] = (registers[a] + 1) & MASK
+        elif op == OP_DEC:
+            registers[a] = (registers[a] - 1) & MASK
+        elif op == OP_CMP:
+            x = registers[a]
+            y = registers[b]
+            if imm == 0:
+                result = x == y
+            elif imm == 1:
+                result = x != y
+            elif imm == 2:
+                result = x < y
+            elif imm == 3:
+                result = x > y
+            elif imm == 4:
+                result = x <= y
+            else:
+                result = x >= y
+            registers[c] = 1 if result else 0
+        elif op == OP_CONST:
+            registers[c] = imm
+        elif op == OP_LOAD:
+            registers[b] = memory[registers[a] + imm] & MASK
+        elif op == OP_STORE:
+            addr = registers[b] + imm
+            memory[addr] = registers[a]
+            if addr == IO_OUT:
+                registers[0] = 0
+                return True
+        elif op == OP_JMP:
+            registers[PC] = registers[a] + imm
+        elif op == OP_JMP_ABS:
+            registers[PC] = imm
+        elif op == OP_BZ:
+            if not registers[a]:
+                registers[PC] = imm
+        else:                           # HALT
+            registers[0] = 0
+            return False
+        registers[0] = 0
+
+if njit is not None:
+    execute = njit(cache=True)(execute)
+
+class Halt(Exception):
+    pass
+
 class Metal:
     def run(self, instructions):
         '''
@@ -62,73 +232,103 @@ class Metal:
         are initialized to 0.  R7 is initialized with the highest valid
         memory index (len(memory) - 2).
         '''
-        self.registers = { f'R{d}':0 for d in range(8) }
-        self.registers['PC'] = 0
-        self.instructions = instructions
+        self.instructions = decode(instructions)
+        if njit is not None:
+            return self.run_compiled()
+        self.registers = [0] * len(REGISTERS)
         self.memory = [0] * 65536
-        self.registers['R7'] = len(self.memory) - 2
-        self.running = True
-        while self.running:
-            op, *args = self.instructions[self.registers['PC']]
-            # Uncomment to debug what's happening
-            # print(self.registers['PC'], op, args)
-            self.registers['PC'] += 1
-            getattr(self, op)(*args)
-            self.registers['R0'] = 0    # R0 is always 0 (even if you change it)
+        self.registers[REGISTERS['R7']] = len(self.memory) - 2
+        # Resolve each opcode to its bound method once, instead of paying
+        # for a getattr() on every instruction executed. The program is
+        # split into a list of handlers and a list of operand tuples so
+        # that no tuple is unpacked on each step.
+        handlers = { name: getattr(self, name) for name in OPCODES }
+        ops = [ handlers[op] for op, *_ in self.instructions ]
+        operands = [ tuple(args) for _, *args in self.instructions ]
+        registers = self.registers
+        try:
+            while True:
+                pc = registers[PC]
+                # Uncomment to debug what's happening
+                # print(pc, self.instructions[pc])
+                registers[PC] = pc + 1
+                ops[pc](*operands[pc])
+        except Halt:
+            pass
         return
 
+    def run_compiled(self):
+        '''
+        Run the loaded program with the jitted execute() loop.  The
+        registers and memory are 32-bit unsigned NumPy arrays.
+        '''
+        opcodes, a, b, c, imm = encode(self.instructions)
+        code = (np.array(opcodes, dtype=np.uint8),
+                np.array(a, dtype=np.uint8),
+                np.array(b, dtype=np.uint8),
+                np.array(c, dtype=np.uint8),
+                np.array(imm, dtype=np.int64))
+        self.registers = registers = np.zeros(len(REGISTERS), dtype=np.uint32)
+        self.memory = memory = np.zeros(65536, dtype=np.uint32)
+        registers[REGISTERS['R7']] = len(memory) - 2
+        while execute(*code, registers, memory):
+            print(memory[IO_OUT])
+
+    # R0 is always 0 (even if you change it).  Instructions that write
+    # a register simply skip the write when the destination is R0.
+
     def ADD(self, ra, rb, rd):
-        self.registers[rd] = (self.registers[ra] + self.registers[rb]) & MASK
+        if rd:
+            self.registers[rd] = (self.registers[ra] + self.registers[rb]) & MASK
 
     def SUB(self, ra, rb, rd):
-        self.registers[rd] = (self.registers[ra] - self.registers[rb]) & MASK
+        if rd:
+            self.registers[rd] = (self.registers[ra] - self.registers[rb]) & MASK
 
     def MUL(self, ra, rb, rd):
-        self.registers[rd] = (self.registers[ra] * self.registers[rb]) & MASK        
-        
+        if rd:
+            self.registers[rd] = (self.registers[ra] * self.registers[rb]) & MASK
+
     def INC(self, ra):
-        self.registers[ra] = (self.registers[ra] + 1) & MASK
+        if ra:
+            self.registers[ra] = (self.registers[ra] + 1) & MASK
 
     def DEC(self, ra):
-        self.registers[ra] = (self.registers[ra] - 1) & MASK
+        if ra:
+            self.registers[ra] = (self.registers[ra] - 1) & MASK
 
     def CMP(self, op, ra, rb, rd):
-        if op == '==':
-            self.registers[rd] = int(self.registers[ra] == self.registers[rb])
-        elif op == '!=':
-            self.registers[rd] = int(self.registers[ra] != self.registers[rb])
-        elif op == '<':
-            self.registers[rd] = int(self.registers[ra] < self.registers[rb])
-        elif op == '>':
-            self.registers[rd] = int(self.registers[ra] > self.registers[rb])
-        elif op == '<=':
-            self.registers[rd] = int(self.registers[ra] <= self.registers[rb])
-        elif op == '>=':
-            self.registers[rd] = int(self.registers[ra] >= self.registers[rb])
-        else:
-            raise RuntimeError(f'Bad comparison {op}. Must be ==, !=, <, >, <=, >=')
-            
+        if rd:
+            self.registers[rd] = int(op(self.registers[ra], self.registers[rb]))
+
     def CONST(self, value, rd):
-        self.registers[rd] = value & MASK
+        if rd:
+            self.registers[rd] = value & MASK
 
     def LOAD(self, rs, rd, offset):
-        self.registers[rd] = (self.memory[self.registers[rs]+offset]) & MASK
+        if rd:
+            self.registers[rd] = (self.memory[self.registers[rs]+offset]) & MASK
 
     def STORE(self, rs, rd, offset):
         addr = self.registers[rd]+offset
-        self.memory[self.registers[rd]+offset] = self.registers[rs]
-        if addr == IO_OUT:
-            print(self.registers[rs])
+        value = self.registers[rs]
+        if addr != IO_OUT:
+            self.memory[addr] = value
+        else:
+            print(value)
 
     def JMP(self, rd, offset):
-        self.registers['PC'] = self.registers[rd] + offset
+        self.registers[PC] = self.registers[rd] + offset
+
+    def JMP_ABS(self, target):
+        self.registers[PC] = target
 
-    def BZ(self, rt, offset):
+    def BZ(self, rt, target):
         if not self.registers[rt]:
-            self.registers['PC'] += offset
+            self.registers[PC] = target
 
     def HALT(self):
-        self.running = False
+        raise Halt()
 
 # =============================================================================
 
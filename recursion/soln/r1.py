@@ -1,9 +1,27 @@
 # r1.py
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+INT64_MIN, INT64_MAX = -2**63, 2**63 - 1
+
+def _count_multiples(a, b):
+    count = 0
+    while b % a == 0:
+        b //= a
+        count += 1
+    return count
+
+if njit is not None:
+    _count_multiples_int64 = njit('i8(i8, i8)', cache=True)(_count_multiples)
+
 def count_multiples(a, b):
-    if b % a == 0:
-        return 1 + count_multiples(a, b // a)
-    else:
-        return 0
+    if b == 0 or a in (1, -1):
+        raise ValueError(f'{b} is divisible by {a} without end')
+    if njit is not None and INT64_MIN <= a <= INT64_MAX and INT64_MIN <= b <= INT64_MAX:
+        return _count_multiples_int64(a, b)
+    return _count_multiples(a, b)
 
 assert count_multiples(2, 6) == 1
 assert count_multiples(2, 12) == 2
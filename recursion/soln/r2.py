@@ -1,10 +1,10 @@
 # r2.py
 
 def maxval(items):
-    if len(items) == 1:
-        return items[0]
-    else:
-        mv = maxval(items[1:])
-        return items[0] if items[0] > mv else mv
+    mv = items[0]
+    for it in items:
+        if it > mv:
+            mv = it
+    return mv
 
 assert maxval([1, 9, -3, 7, 13, 2, 3]) == 13
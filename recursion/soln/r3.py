@@ -2,11 +2,16 @@
 
 def flatten(items):
     result = []
-    for it in items:
-        if isinstance(it, list):
-            result.extend(flatten(it))
+    stack = [iter(items)]
+    while stack:
+        for it in stack[-1]:
+            if isinstance(it, list):
+                stack.append(iter(it))
+                break
+            else:
+                result.append(it)
         else:
-            result.append(it)
+            stack.pop()
     return result
 
 assert flatten([1, [2, [3,4], 5,], 6]) == [1,2,3,4,5,6]
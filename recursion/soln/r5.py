@@ -1,13 +1,18 @@
 # r5.py
 
 def merge(items_1, items_2):
-    if not items_1:
-        return items_2
-    elif not items_2:
-        return items_1
-    elif items_1[0] <= items_2[0]:
-        return [items_1[0]] + merge(items_1[1:], items_2)
-    else:
-        return [items_2[0]] + merge(items_1, items_2[1:])
+    n1, n2 = len(items_1), len(items_2)
+    result = [None] * (n1 + n2)
+    i = j = k = 0
+    while i < n1 and j < n2:
+        if items_1[i] <= items_2[j]:
+            result[k] = items_1[i]
+            i += 1
+        else:
+            result[k] = items_2[j]
+            j += 1
+        k += 1
+    result[k:] = items_1[i:] if i < n1 else items_2[j:]
+    return result
 
 assert merge([1,8,9,14,15], [2,10,23]) == [1,2,8,9,10,14,15,23]
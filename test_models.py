@@ -23,7 +23,10 @@
 # working.
 
 from wabbit.model import *
-from wabbit import interp
+
+# One display context is enough for every top-level print below
+_CTX = DisplayContext(None)
+
 # ----------------------------------------------------------------------
 # A simple Expression
 #
@@ -34,16 +37,15 @@ print("\n\n--- Simple Expression")
 
 expr_source = "2 + 3 * 4"
 
-expr_model  = BinOp('+', Integer('2'),
-                         BinOp('*', Integer('3'), Integer('4')))
+expr_model  = BinOp('+', make_integer('2'),
+                         BinOp('*', make_integer('3'), make_integer('4')))
 
 # Can you turn it back into source code?  Note: the to_source()
 # function is found in wabbit/model.py.
 
 # Uncomment:
-print(to_source_pp(expr_model,DisplayContext(None)))
+print(to_source_pp(expr_model, _CTX))
 print('**interpretation**')
-#print(interp.interpret_program(expr_model))
 
 # ----------------------------------------------------------------------
 # Program 1: Printing
@@ -64,33 +66,32 @@ source1 = """
 """
 
 model1 = Block([
-    PrintStatement(Integer('2')),
+    PrintStatement(make_integer('2')),
     PrintStatement(BinOp('+',
-                         Integer('2'),
-                         Integer('3'))),
+                         make_integer('2'),
+                         make_integer('3'))),
     PrintStatement(BinOp('+',
-                         UnaryOp('-', Integer('2')),
-                         Integer('3'))),
+                         UnaryOp('-', make_integer('2')),
+                         make_integer('3'))),
     PrintStatement(BinOp('+',
-                         Integer('2'),
+                         make_integer('2'),
                          BinOp('*',
-                               Integer('3'),
-                               UnaryOp('-', Integer('4'))))),
+                               make_integer('3'),
+                               UnaryOp('-', make_integer('4'))))),
     PrintStatement(BinOp('*',
                          Grouped(BinOp('+',
-                                       Integer('2'),
-                                       Integer('3'))),
-                         UnaryOp('-', Integer('4')))),
+                                       make_integer('2'),
+                                       make_integer('3'))),
+                         UnaryOp('-', make_integer('4')))),
     PrintStatement(BinOp('/',
                          BinOp('-',
-                               Float('2.0'),
-                               Float('3.0')),
-                         UnaryOp('-', Float('4.0'))))
+                               make_float('2.0'),
+                               make_float('3.0')),
+                         UnaryOp('-', make_float('4.0'))))
     ])
 
-print(to_source_pp(model1,DisplayContext(None)))
+print(to_source_pp(model1, _CTX))
 print('\n<< interpreter running .... >>')
-#print(interp.interpret_program(model1))
 
 # ----------------------------------------------------------------------
 # Program 2: Variable and constant declarations. 
@@ -110,18 +111,17 @@ source2 = """
 """
 
 model2 = Block([
-    ConstDeclaration('pi', None, Float('3.14159')),
-    ConstDeclaration('tau', None, BinOp('*', Float('2.0'), Name('pi'))),
-    VarDeclaration('radius', None, Float('4.0')),
-    VarDeclaration('perimeter', Type('float'), None),
+    ConstDeclaration('pi', None, make_float('3.14159')),
+    ConstDeclaration('tau', None, BinOp('*', make_float('2.0'), Name('pi'))),
+    VarDeclaration('radius', None, make_float('4.0')),
+    VarDeclaration('perimeter', make_type('float'), None),
     Assignment(Name('perimeter'), BinOp('*', Name('tau'), Name('radius'))),
     PrintStatement(Name('perimeter')),
     ])
 
 # print(to_source(model2))
-print(to_source_pp(model2, DisplayContext()))
+print(to_source_pp(model2, _CTX))
 print('\n<< interpreter running .... >>')
-#print(interp.interpret_program(model2))
 
 # ----------------------------------------------------------------------
 # Program 3: Relations.  You have to be able to compare values.
@@ -137,10 +137,10 @@ source3 = '''
 '''
 
 model3 = Block([
-    PrintStatement(RelOp('==', Integer('1'), Integer('1'))),
-    PrintStatement(RelOp('==', Integer('0'), Integer('1'))),
-    PrintStatement(RelOp('>', Integer('1'), Integer('0'))),
-    PrintStatement(RelOp('!=', Boolean('false'), Boolean('true')))
+    PrintStatement(RelOp('==', make_integer('1'), make_integer('1'))),
+    PrintStatement(RelOp('==', make_integer('0'), make_integer('1'))),
+    PrintStatement(RelOp('>', make_integer('1'), make_integer('0'))),
+    PrintStatement(RelOp('!=', make_boolean('false'), make_boolean('true')))
     ])
 
 # Preview (later)
@@ -148,9 +148,8 @@ model3 = Block([
 # assert parsed_model3 == model3
 
 # print(to_source(model3))
-print(to_source_pp(model3,DisplayContext()))
+print(to_source_pp(model3, _CTX))
 print('\n<< interpreter running .... >>')
-#print(interp.interpret_program(model3))
 
 
 # ----------------------------------------------------------------------
@@ -172,9 +171,9 @@ source4 = '''
 '''
 
 model4 = Block([
-    VarDeclaration('a', Type('int'), Integer('2')),
-    VarDeclaration('b', Type('int'), Integer('3')),
-    VarDeclaration('minval', Type('int'), None),
+    VarDeclaration('a', make_type('int'), make_integer('2')),
+    VarDeclaration('b', make_type('int'), make_integer('3')),
+    VarDeclaration('minval', make_type('int'), None),
     IfStatement(RelOp('<', Name('a'), Name('b')),
                 Block([
                     #ExprStatement(Assignment(Name('minval'), Name('a'))),
@@ -188,9 +187,8 @@ model4 = Block([
     ])
 
 # print(to_source(model4))
-print(to_source_pp(model4,DisplayContext()))
+print(to_source_pp(model4, _CTX))
 print('\n<< interpreter running .... >>')
-#print(interp.interpret_program(model4))
 
 # ----------------------------------------------------------------------
 # Program 5: Loops.  This program prints out the first 10 factorials.
@@ -210,23 +208,22 @@ source5 = '''
 '''
 
 model5 = Block([
-    ConstDeclaration('n', None, Integer('10')),
-    VarDeclaration('x', Type('int'), Integer('1')),
-    VarDeclaration('fact', Type('int'), Integer('1')),
+    ConstDeclaration('n', None, make_integer('10')),
+    VarDeclaration('x', make_type('int'), make_integer('1')),
+    VarDeclaration('fact', make_type('int'), make_integer('1')),
     WhileStatement(RelOp('<=', Name('x'), Name('n')),
                    Block([
                        # ExprStatement(Assignment(Name('fact'), BinOp('*', Name('fact'), Name('x')))),
                        Assignment(Name('fact'), BinOp('*', Name('fact'), Name('x'))),
                        # ExprStatement(Assignment(Name('x'),BinOp('+', Name('x'),Integer('1')))),
-                       Assignment(Name('x'),BinOp('+', Name('x'),Integer('1'))),
+                       Assignment(Name('x'),BinOp('+', Name('x'),make_integer('1'))),
                        PrintStatement(Name('fact'))
                        ])),
     ])
 
 # print(to_source(model5))
-print(to_source_pp(model5,DisplayContext()))
+print(to_source_pp(model5, _CTX))
 print('\n<< interpreter running .... >>')
-#print(interp.interpret_program(model5))
 
 # -----------------------------------------------------------------------------
 # Program 6: Break/continue.  This program changes loop control flow
@@ -248,27 +245,26 @@ source6 = '''
 '''
 
 model6=Block([
-    VarDeclaration('n', None, Integer('0')),
+    VarDeclaration('n', None, make_integer('0')),
     WhileStatement(
-        Boolean('true'),
+        make_boolean('true'),
         Block([
-            IfStatement(RelOp('==', Name('n'), Integer('2')),
+            IfStatement(RelOp('==', Name('n'), make_integer('2')),
                         Block([
                             PrintStatement(Name('n')),
                             BreakStatement()
                         ]),
                         Block([
-                            Assignment(Name('n'),BinOp('+',Name('n'),Integer('1'))),
+                            Assignment(Name('n'),BinOp('+',Name('n'),make_integer('1'))),
                             ContinueStatement()
                         ])),
-            Assignment(Name('n'),BinOp('-', Name('n'),Integer('1')))
+            Assignment(Name('n'),BinOp('-', Name('n'),make_integer('1')))
         ]))
 ])
 
 # print(to_source(model6))
-print(to_source_pp(model6, DisplayContext()))
+print(to_source_pp(model6, _CTX))
 print('\n<< interpreter running .... >>')
-#print(interp.interpret_program(model6))
 
 
 # ----------------------------------------------------------------------
@@ -284,16 +280,15 @@ source6a = '''
     print y;   // Prints 37
 '''
 model6a = Block([
-    VarDeclaration('y', None, Integer('42')),
-    VarDeclaration('x', None, Integer('37')),
+    VarDeclaration('y', None, make_integer('42')),
+    VarDeclaration('x', None, make_integer('37')),
     # ExprStatement(Assignment(Name('y'), Name('x'))),
     # Assignment(Name('y'), BinOp('-',Name('x'),Integer('1'))),
-    ExprStatement(Assignment(Name('y'), BinOp('-',Name('x'),Integer('1')))),
+    ExprStatement(Assignment(Name('y'), BinOp('-',Name('x'),make_integer('1')))),
     PrintStatement(Name('y'))
 ])
 print(to_source(model6a))
 print('\n<< interpreter running .... >>')
-#print(interp.interpret_program(model6a))
 
 # ----------------------------------------------------------------------
 # Program 7: Compound Expressions.  This program swaps the values of
@@ -314,8 +309,8 @@ source7 = '''
 '''
 
 model7 = Block([
-    VarDeclaration('x', None, Integer('37')),
-    VarDeclaration('y', None, Integer('42')),
+    VarDeclaration('x', None, make_integer('37')),
+    VarDeclaration('y', None, make_integer('42')),
     ExprStatement(Assignment(Name('x'),
                             Compound([
                                 VarDeclaration('t', None, Name('y')),
@@ -327,9 +322,8 @@ model7 = Block([
     ])
 
 # print(to_source(model7))
-print(to_source_pp(model7,DisplayContext()))
+print(to_source_pp(model7, _CTX))
 print('\n<< interpreter running .... >>')
-#print(interp.interpret_program(model7))
 
 
 
@@ -383,12 +377,12 @@ model8 = Block([
                 FunctionDefinition(
                               Name('add'),
                               FunctionParameters([
-                                  FunctionParameter('x', Type('int'), None),
-                                  FunctionParameter('y', Type('float'), Integer('2'))
+                                  FunctionParameter('x', make_type('int'), None),
+                                  FunctionParameter('y', make_type('float'), make_integer('2'))
                               ]),
-                              Type('int'),
+                              make_type('int'),
                               Block([
-                                  Assignment(Name('x'),BinOp('+',Name('x'),Integer('2'))),
+                                  Assignment(Name('x'),BinOp('+',Name('x'),make_integer('2'))),
                                   FunctionReturn(BinOp('*',Name('x'),Name('y')))
                               ])),
                 VarDeclaration('result',
@@ -396,17 +390,19 @@ model8 = Block([
                                FunctionApplication(
                                    Name('add'),
                                    FunctionArguments([
-                                       Integer('4'),
-                                       Integer('3'),
+                                       make_integer('4'),
+                                       make_integer('3'),
                                    ])
                                )),
     PrintStatement(Name('result'))
 ])
 
 # print(to_source(model8))
-print(to_source_pp(model8, DisplayContext()))
+print(to_source_pp(model8, _CTX))
 print('\n<< interpreter running .... >>')
-print(interp.interpret_program(model8))
+if __name__ == '__main__':
+    from wabbit import interp
+    print(interp.interpret_program(model8))
 
 
 print('\n\n--- Program 9')
@@ -37,19 +37,38 @@ expr_source = "2 + 3 * 4"
 expr_model  = BinOp('+', Integer('2'),
                          BinOp('*', Integer('3'), Integer('4')))
 
+def _push_binop(node, stack, parts):
+    stack.append(node.right)
+    stack.append(node.op)
+    stack.append(node.left)
+
+
+def _emit_text(text, stack, parts):
+    parts.append(text)
+
+
+def _emit_leaf(node, stack, parts):
+    parts.append(node.eval)
+
+
+# How each kind of stack item is handled.  Anything else is a leaf.
+_DISPATCH = {
+    BinOp: _push_binop,
+    str: _emit_text,
+}
+
+
 def to_source(node):
-    s = ""
-    if type(node) == BinOp :
-        if type(node.left) == BinOp:
-            s = s+to_source(node.left)
-        else:
-            s = s+node.left.eval
-        s = s+node.op
-        if type(node.right) == BinOp:
-            s = s+to_source(node.right)
-        else:
-            s = s+node.right.eval
-    return s
+    if type(node) != BinOp:
+        return ""
+    # Walk the tree with an explicit stack.  Operators are pushed as plain
+    # strings between their operands so they come out in source order.
+    parts = []
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        _DISPATCH.get(type(item), _emit_leaf)(item, stack, parts)
+    return ''.join(parts)
 
 
 
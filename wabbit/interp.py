@@ -27,17 +27,17 @@
 #        if isinstance(node, ModelClass):
 #            # Execute "node" in the environment "context"
 #            ...
-#            return (result_type, result_value)
+#            return result_value
 #        ...
 #   
 # The input to the interpret() will be an object from model.py (node)
 # along with an object respresenting the execution environment
 # (context).  In executing the node, the environment might be
 # modified (for example, when executing assignment expressions,
-# making variable definitions, etc.).  The return result will
-# consist of a type along with a value.   These types and values
-# are from Wabbit, not Python.   For example, a result might 
-# look like ('int', 34) or ('float', 3.4).
+# making variable definitions, etc.).  The return result is a
+# plain Python value such as 34 or 3.4.  Its Wabbit type follows from
+# its Python type (see _wabbit_types below): int, float, bool, and
+# str for a char.
 #
 # In addition to executing the code, you should try to check for
 # as many programming errors as possible.   For example, Wabbit
@@ -66,6 +66,8 @@
 # link those dictionaries together in some manner.
 
 from .model import *
+from collections import OrderedDict
+import operator
 
 _default_type_values = {
     'int': 0,
@@ -74,70 +76,137 @@ _default_type_values = {
     'char': '\x00'
 }
 
+# The (type, value) a declaration without an initializer starts out with
+_default_values = {name: (name, value) for name, value in _default_type_values.items()}
 
-class FunctionReturnFlowBreaker(Exception):
+# The Wabbit type of each kind of Python value.  bool is a subclass of
+# int, so always look up the exact type of a value.
+_wabbit_types = {
+    int: 'int',
+    float: 'float',
+    bool: 'bool',
+    str: 'char',
+}
+
+_python_types = {name: cls for cls, name in _wabbit_types.items()}
+
+# The Python function behind each operator, by operand type.  Integers
+# divide with // and floats with /.
+_binops = {
+    int: {
+        '+': operator.add,
+        '-': operator.sub,
+        '*': operator.mul,
+        '/': operator.floordiv,
+    },
+    float: {
+        '+': operator.add,
+        '-': operator.sub,
+        '*': operator.mul,
+        '/': operator.truediv,
+    },
+}
+
+_ordered_relops = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '>=': operator.ge,
+    '>': operator.gt,
+    '!=': operator.ne,
+}
+
+_relops = {
+    int: _ordered_relops,
+    float: _ordered_relops,
+    str: _ordered_relops,
+    bool: {
+        '==': operator.eq,
+        '!=': operator.ne,
+    },
+}
+
+# Statements normally interpret to None.  The ones that change the flow
+# of control hand back a Flow object instead, which each enclosing Block
+# passes up until a loop or a function call acts on it.  BREAK and
+# CONTINUE are shared; a return carries its result.
+class Flow:
+    __slots__ = ('value',)
+
+    def __init__(self, value=None):
+        self.value = value
+
+
+BREAK = Flow()
+CONTINUE = Flow()
+
+
+# A Flow from a statement inside a compound expression can't be handed
+# back as the expression's value, since whatever the compound is part of
+# would take it for one.  It is raised inside a _FlowEscape instead and
+# becomes a plain Flow again at the nearest enclosing run of statements
+# (a Block, a loop body or a function body).
+class _FlowEscape(Exception):
+    def __init__(self, flow):
+        self.flow = flow
+
+
+# What a name is bound to in a Context: its kind ('var', 'const' or
+# 'func'), its type and its current value.  Assignment updates the
+# value in place.
+class Slot:
+    __slots__ = ('kind', 'type', 'value')
 
-    def __init__(self, return_type, return_value, message=None):
-        # Call the base class constructor with the parameters it needs
-        super().__init__(message)
-        self.return_type = return_type
-        self.return_value = return_value
+    def __init__(self, kind, type, value):
+        self.kind = kind
+        self.type = type
+        self.value = value
 
-    def get_payload(self):
-        if self.return_type == 'int':
-            return self.return_type, int(self.return_value)
-        elif self.return_type == 'float':
-            return self.return_type, float(self.return_value)
-        elif self.return_type == 'char':
-            return self.return_type, eval(self.return_value)
-        elif self.return_type == 'bool':
-            _r = True if self.return_value == 'true' else False
-            return self.return_type, _r
+    def __repr__(self):
+        return f'Slot({self.kind}, {self.type}, {self.value})'
 
 
 # Class representing the execution environment of the interpreter.
 class Context:
+    __slots__ = ('env', 'parent', 'root', 'funcs', 'stamp')
 
     # create a context from scratch
     def __init__(self, parent=None):
         self.env = {}  # Storage for all scoped variables
         self.parent = parent  # Pointer to parent' scope
+        self.root = parent.root if parent else self  # The global scope
+        self.funcs = parent.funcs if parent else {}  # Global functions by name, shared
+        self.stamp = object()  # Replaced whenever a name is defined here, see _lookup_slot()
 
     # spawn a child context, passing the current scope as the parent
     def spawn_child_context(self):
         return Context(parent=self)
 
-    # Lookup const, var in the current scope. And if not found, search recursively in the parent scope
+    # Lookup const, var in the current scope. And if not found, search the parent scopes in turn
     def lookup(self, name):
-        if name in self.env:
-            return self.env[name]
-        else:
-            # print('recursing through parent context looking for ', name)
-            if self.parent:
-                return self.parent.lookup(name)
-            else:
-                raise RuntimeError("Variable " + name + " not defined")
+        context = self
+        while context is not None:
+            slot = context.env.get(name)
+            if slot is not None:
+                return slot
+            context = context.parent
+        raise RuntimeError("Variable " + name + " not defined")
 
     # Define new const, vars always in the current scope
     def define(self, name, initializer):
         # self.display_stack()
         if name in self.env:
-            kind, _2, _3 = self.env[name]
-            if kind == 'func':
+            if self.env[name].kind == 'func':
                 raise RuntimeError(f"Function {name}() already defined")
             else:
                 self.display_stack()
                 raise RuntimeError(f"Variable {name} already declared")
         self.env[name] = initializer
+        self.stamp = object()
 
-    # Assign value to a const, var in the current scope. And if not found, search recursively in the parent scope
+    # Assign value to a const, var in the current scope. And if not found, search the parent scopes in turn
     def assign(self, name, value):
-        if name not in self.env:
-            if self.parent:
-                self.parent.assign(name, value)
-            else:
-                raise RuntimeError("Variable not defined")
-        self.env[name] = value
+        self.lookup(name).value = value
 
     def display_stack(self, lvl=1):
         print('--' * lvl + '>[Stack]: <' + str(self.env))
@@ -155,385 +224,967 @@ class Context:
 # initial environment that's used for storing variables.
 
 def interpret_program(model):
+    # What was worked out about the functions of a previous program
+    # doesn't apply to this one
+    for cache in (_parameters, _needs_scope, _call_counts, _native, _pure_functions, _memos):
+        cache.clear()
+    clear_node_caches(model)
+    fold_constants(model)
+
     # Make the initial environment (a dict).  The environment is
     # where you will create and store variables.
     context = Context(parent=None)
-    return interpret(model, context)
+    try:
+        return model.interpret(context)
+    finally:
+        # don't keep the program's slots alive through its model
+        clear_node_caches(model)
+
+
+# The interpreter keeps a few things on the nodes themselves: where a
+# Name was last found, the function a call is bound to and the value of
+# a constant operator.  They only hold for one run of a program.
+def clear_node_caches(model):
+    for node in walk(model):
+        node_type = type(node)
+        if node_type is Name:
+            node._cached_stamp = None
+            node._cached_slot = None
+        elif node_type is FunctionApplication:
+            node._target = None
+        elif node_type in _foldable:
+            node._constant = None
+
+
+# Operators whose operands are literals, or are themselves folded, come
+# out the same every time.  Before a program runs, each one has its value
+# stored in its _constant slot and the handlers below return that
+# instead of evaluating it again.  An operator that would fail (1 / 0,
+# 1 + 2.0) is left alone, so the error still comes when the program
+# gets there.
+_literals = {Integer, Float, Boolean, Char}
+_foldable = {BinOp, RelOp, UnaryOp, Grouped}
+
+
+def _is_constant(node):
+    return type(node) in _literals or (type(node) in _foldable and node._constant is not None)
+
+
+def fold_constants(model):
+    # walk() gives each node before its children, so in reverse the
+    # operands of an operator are always folded before it is
+    for node in reversed(list(walk(model))):
+        if type(node) in _foldable:
+            node._constant = None
+            if all(_is_constant(child) for child in node.children()):
+                try:
+                    node._constant = node.interpret(None)
+                except (RuntimeError, ArithmeticError):
+                    pass
 
 
-# Internal function to interpret a node in the environment.  You need
-# to expand to cover all of the classes in the model.py file. 
+# Internal functions to interpret a node in the environment.  There is
+# one handler for each of the classes in the model.py file.  Each one
+# returns the actual pythonic value.
 
-def interpret(node, context):
+# Literals carry their value, converted when the node was built
+def _interp_Integer(node, context):
+    return node._v
 
-    # returning wabbit-type, actual pythonic value
-
-    if isinstance(node, Integer):
-        return ('int', int(node.value))
-
-    elif isinstance(node, Float):
-        return ('float', float(node.value))
-
-    elif isinstance(node, PrintStatement):
-        # print("Interpreting PrinStatement", node.value)
-
-        valuetype, value = interpret(node.value, context)
-        # print (valuetype, value)
-        # The type is useful if you need to carry out special processing.
-        if valuetype == 'char':
-                print(value, end='')
-        elif valuetype == 'bool':
-            # print(value)
-            print('true' if value else 'false')
-        elif valuetype == 'int':
-            print(value)
-        elif valuetype == 'float':
-            print(value)
-        else:
-            print(value)
 
-    elif isinstance(node, Boolean):
-        # this is the code which killed me in the mandelbrot set diagram creation
-        # remember tokenization process gives back 'true' and 'false' as python strings
-        # you need to convert from python string into python boolean - True False
-        return 'bool', node.value == 'true'
+def _interp_Float(node, context):
+    return node._v
 
-    elif isinstance(node, Char):
-        return 'char', eval(node.value)
 
-    elif isinstance(node, Name):
+# How each type of value gets printed.  Anything else (int, float)
+# uses plain print().
+def _print_char(value):
+    print(value, end='')
+
+
+def _print_bool(value):
+    print('true' if value else 'false')
 
-        kind, value_type, value = context.lookup(node.value)
-        k = (value_type, value)
-        if node.value == 'in_mandel':
-            pass
-            # print('in_mandel',k)
-        return k
-
-    elif isinstance(node, BinOp):
-
-        # Note: all values are tagged with a Wabbit type.
-        # See the code for "Integer" and "Float" above.
-        # Knowing the type is essential for type-checking.
-        left_type, left_value = interpret(node.left, context)
-        right_type, right_value = interpret(node.right, context)
-        if left_type != right_type:
-            raise RuntimeError("Type error in binary operator")
-        if left_type in {'int', 'float'}:
-            if node.op == '+':
-                return left_type, left_value + right_value
-            elif node.op == '-':
-                return left_type, left_value - right_value
-            elif node.op == '*':
-                return left_type, left_value * right_value
-            elif node.op == '/':
-                if left_type == 'int':
-                    return left_type, left_value // right_value
-                else:
-                    return left_type, left_value / right_value
-        raise RuntimeError(f"Unsupported operation {node.op}")
 
-    elif isinstance(node, RelOp):
-        left_type, left_value = interpret(node.left, context)
-        right_type, right_value = interpret(node.right, context)
-        if left_type != right_type:
-            raise RuntimeError("Type error in relational operator")
-        # print ('RelOp -->', left_type, left_value, right_type, right_value)
-        if left_type in {'int', 'float', 'char'}:
-            if node.op == '<':
-                return 'bool', left_value < right_value
-            elif node.op == '<=':
-                return 'bool', left_value <= right_value
-            elif node.op == '==':
-                return 'bool', left_value == right_value
-            elif node.op == '>=':
-                return 'bool', left_value >= right_value
-            elif node.op == '>':
-                return 'bool', left_value > right_value
-            elif node.op == '!=':
-                return 'bool', left_value != right_value
-        elif left_type in {'bool'}:
-            if node.op == '==':
-                return 'bool', left_value == right_value
-            elif node.op == '!=':
-                return 'bool', left_value != right_value
-        raise RuntimeError(f"Unsupported operation {node.op} for {left_type}")
-
-    elif isinstance(node, UnaryOp):
-        value_type, value = interpret(node.value, context)
-        if value_type in {'int', 'float'}:
-            if node.op == '-':
-                value *= (-1)
-            return value_type, value
-        if value_type in {'bool'}:
-            # print(value_type, value)
-            value = (not value)
-            return value_type, value
+_printers = {
+    str: _print_char,
+    bool: _print_bool,
+}
+
+
+def _interp_PrintStatement(node, context):
+    # print("Interpreting PrinStatement", node.value)
+
+    value = node.value.interpret(context)
+    # The type is useful if you need to carry out special processing.
+    _printers.get(type(value), print)(value)
+
+
+def _interp_Boolean(node, context):
+    # this is the code which killed me in the mandelbrot set diagram creation
+    # remember tokenization process gives back 'true' and 'false' as python strings
+    # you need to convert from python string into python boolean - True False
+    # (model.Boolean now does that when the node is built)
+    return node._v
+
+
+def _interp_Char(node, context):
+    return node._ch
+
+
+# Each Name remembers the stamp of the context it was last looked up in
+# and the Slot it found there.  A loop body runs in the same context on
+# every pass, so after the first pass its names skip the walk up the
+# scope chain.  Defining a name in a context gives it a new stamp: the
+# new name may shadow a slot found further up, so every Name looked up
+# in that context has to look again.
+def _lookup_slot(node, context):
+    if node._cached_stamp is context.stamp:
+        return node._cached_slot
+    slot = context.lookup(node.value)
+    node._cached_stamp = context.stamp
+    node._cached_slot = slot
+    return slot
+
+
+def _interp_Name(node, context):
+    if node._cached_stamp is context.stamp:
+        return node._cached_slot.value
+    return _lookup_slot(node, context).value
+
+
+def _interp_BinOp(node, context):
+    constant = node._constant
+    if constant is not None:
+        return constant
+
+    # Note: the Wabbit type of a value is given by its Python type.
+    # See _wabbit_types above.  Knowing the type is essential for
+    # type-checking.
+    left_value = node.left.interpret(context)
+    right_value = node.right.interpret(context)
+    if type(left_value) is not type(right_value):
+        raise RuntimeError("Type error in binary operator")
+    try:
+        result = _binops[type(left_value)][node.op](left_value, right_value)
+    except KeyError:
+        raise RuntimeError(f"Unsupported operation {node.op}") from None
+    return result
+
+
+def _interp_RelOp(node, context):
+    constant = node._constant
+    if constant is not None:
+        return constant
+    left_value = node.left.interpret(context)
+    right_value = node.right.interpret(context)
+    if type(left_value) is not type(right_value):
+        raise RuntimeError("Type error in relational operator")
+    try:
+        result = _relops[type(left_value)][node.op](left_value, right_value)
+    except KeyError:
+        raise RuntimeError(f"Unsupported operation {node.op} for {_wabbit_types.get(type(left_value))}") from None
+    return result
+
+
+def _interp_UnaryOp(node, context):
+    constant = node._constant
+    if constant is not None:
+        return constant
+    value = node.value.interpret(context)
+    value_type = type(value)
+    if value_type is int or value_type is float:
+        if node.op == '-':
+            value = -value
+    elif value_type is bool:
+        value = (not value)
+    else:
         raise RuntimeError(f"Unsupported operation {node.op}")
+    return value
 
-    elif isinstance(node, Grouped):
-        # print('interp.py --> Grouped.value is ', node.value)
-        return interpret(node.value, context)
 
-    elif isinstance(node, ConstDeclaration):
-        kind = 'const'
-        value_type, value = interpret(node.initializer, context)
-        if value_type in {'int', 'float', 'bool', 'char'}:
-            context.define(node.name, (kind, value_type, value))
-            # context.display_stack()
-        else:
-            raise RuntimeError(f"Unsupported type in constant declaration - {value_type} in {node.name}")
-        return None
+def _interp_Grouped(node, context):
+    constant = node._constant
+    if constant is not None:
+        return constant
+    # print('interp.py --> Grouped.value is ', node.value)
+    result = node.value.interpret(context)
+    return result
 
-    elif isinstance(node, VarDeclaration):
-        kind = 'var'
-        if node.initializer and node.initializer is not NoneType:
-            value_type, value = interpret(node.initializer, context)
-        else:
-            value_type, value = node.type.name, _default_type_values[node.type.name]
-        # print('interp.py -->defining variable', node.name, node)
-        context.define(node.name, (kind, value_type, value))
-        return None
 
-    # function definition
-    elif isinstance(node, FunctionDefinition):
-        kind = 'func'
-        context.define(node.name.value, (kind, node.fn_return_type, node))
+def _interp_ConstDeclaration(node, context):
+    kind = 'const'
+    value = node.initializer.interpret(context)
+    value_type = _wabbit_types.get(type(value))
+    if value_type:
+        context.define(node.name, Slot(kind, value_type, value))
         # context.display_stack()
+    else:
+        raise RuntimeError(f"Unsupported type in constant declaration - {value_type} in {node.name}")
+    return None
 
-        return None
-
-    # function application (i.e. function call)
-    elif isinstance(node, FunctionApplication):
 
-        # save off the current context for future restoration
-        fd = context.lookup(node.name.value)[2]
-        save_current_context = context
+def _interp_VarDeclaration(node, context):
+    kind = 'var'
+    if node.initializer and node.initializer is not NoneType:
+        value = node.initializer.interpret(context)
+        value_type = _wabbit_types.get(type(value))
+    else:
+        value_type, value = _default_values[node.type.name]
+    # print('interp.py -->defining variable', node.name, node)
+    context.define(node.name, Slot(kind, value_type, value))
+    return None
+
+
+# function definition
+def _interp_FunctionDefinition(node, context):
+    kind = 'func'
+    context.define(node.name.value, Slot(kind, node.fn_return_type, node))
+    if context is context.root:
+        context.funcs[node.name.value] = node
+    # context.display_stack()
+
+    return None
+
+
+# The name and expected type of each parameter of a function, worked
+# out on its first call.  A parameter with an initializer takes the type
+# of its initializer, otherwise its declared type.
+_parameters = {}     # FunctionDefinition -> [(name, type), ...]
+
+
+def _function_parameters(fd, context):
+    parameters = []
+    names = set()
+    for parameter in fd.fn_parameters.parameters_list:
+        assert isinstance(parameter, FunctionParameter), parameter
+        if parameter.name in names:
+            raise RuntimeError(f"Variable {parameter.name} already declared")
+        names.add(parameter.name)
+        if parameter.initializer:
+            expected = _wabbit_types.get(type(parameter.initializer.interpret(context.root)))
+        else:
+            expected = parameter.type.name
+        parameters.append((parameter.name, expected))
+    return parameters
 
-        # print('fn node, defn node being evaluated', node.name, fd.name)
-        # if fd.fn_code_block:
-        #    if fd.fn_code_block.statements:
-        #        for statement in fd.fn_code_block.statements:
-        #            print('--->fn defn statements to be evaluated', statement)
 
-        # create a new context
-        context = context.spawn_child_context()
-        # context.display_stack()
+# function application (i.e. function call)
+def _interp_FunctionApplication(node, context):
 
-        # retrieve the function definition
+    # retrieve the function definition.  A call that resolves to a global
+    # function is bound to it, so later calls skip the lookup.
+    fd = node._target
+    if fd is None:
+        fd = context.lookup(node.name.value).value
         assert isinstance(fd, FunctionDefinition), fd   # Being a bit defensive here
-        assert isinstance(fd.fn_code_block.statements, list) and fd.fn_code_block.statements is not None, fd.fn_code_block
-
-        # initialize the context from function definition
-        if fd.fn_parameters:
-            kind = 'var'
-            placement_order=[]
-            for parameter in fd.fn_parameters.parameters_list:
-                assert isinstance(parameter, FunctionParameter), parameter
-                if parameter.initializer and not (parameter.initializer in {None, NoneType}):
-                    value_type, value = interpret(parameter.initializer, context)
-                else:
-                    value_type, value = parameter.type.name, _default_type_values[parameter.type.name]
-                context.define(parameter.name, (kind, value_type, value))
-                placement_order.append(parameter.name)
-
-        # initialize with values from function call
-        if fd.fn_parameters and node.fn_arguments and (len(fd.fn_parameters.parameters_list) == len(node.fn_arguments.arguments_list)):
-            for counter, argument in enumerate(node.fn_arguments.arguments_list):
-
-                _ts, _vs =  interpret(argument, save_current_context)
-
-                _kd = context.lookup(placement_order[counter])[0]
-                _td = context.lookup(placement_order[counter])[1]
-                _vd = None
-
-                if _ts == _td == 'int':
-                    _vd = int(_vs)
-                elif _ts == _td == 'float':
-                    _vd = float(_vs)
-                elif _ts == _td == 'char':
-                    _vd = eval(_vs)
-                elif _ts == _td == 'bool':
-                    _vd = True if argument.value == 'true' else False
-                else:
-                    raise RuntimeError(f'interp.py --> Type mismatch in {node.name.value}() func call. Expected {_td} type in argument {placement_order[counter]}')
-                # over-write the values in the stack with the values from the argument list
-                context.assign(placement_order[counter],  (_kd, _td, _vd))
+        if context.funcs.get(node.name.value) is fd:
+            node._target = fd
+
+    if len(fd.fn_parameters.parameters_list) != len(node.fn_arguments.arguments_list):
+        raise RuntimeError(f'interp.py --> Number of arguments in the call to func {node.name.value}() mismatches the func definition')
+
+    # evaluate the arguments in the caller's context
+    arguments = [argument.interpret(context) for argument in node.fn_arguments.arguments_list]
+    parameters = _parameters.get(fd)
+    if parameters is None:
+        parameters = _parameters[fd] = _function_parameters(fd, context)
+    for (name, expected), value in zip(parameters, arguments):
+        if _wabbit_types.get(type(value)) != expected:
+            raise RuntimeError(f'interp.py --> Type mismatch in {node.name.value}() func call. Expected {expected} type in argument {name}')
+
+    # calls to pure functions are memoized, see is_pure()
+    pure = _pure_functions.get(fd)
+    if pure is None:
+        pure = _pure_functions[fd] = is_pure(fd, context)
+    if pure:
+        memo = _memos.get(fd)
+        if memo is None:
+            memo = _memos[fd] = OrderedDict()
+        key = tuple([repr(value) if type(value) is float else value for value in arguments])
+        if key in memo:
+            memo.move_to_end(key)
+            return memo[key]
+        result = memo[key] = _call_function(fd, node, arguments, context)
+        if len(memo) > MEMO_SIZE:
+            memo.popitem(last=False)
+        return result
+
+    return _call_function(fd, node, arguments, context)
+
+
+# Run the function fd on the evaluated and type-checked arguments of the call node
+def _call_function(fd, node, arguments, context):
+
+    # save off the current context for future restoration
+    save_current_context = context
+
+    # hot functions are compiled, see compile_function()
+    native = _native.get(fd)
+    if native is None:
+        calls = _call_counts[fd] = _call_counts.get(fd, 0) + 1
+        if calls >= HOT_CALL_COUNT:
+            native = _native[fd] = compile_function(fd, context) or False
+    if native:
+        try:
+            return native(*arguments)
+        except OverflowError:
+            # An int outside 64 bits, see compile_function().  The
+            # interpreter below gets the exact answer.
+            pass
+
+    # create a new context.  It hangs off the global scope rather than
+    # the caller's, so the body only sees its own locals and the globals
+    # however deep the calls are nested.
+    context = context.root.spawn_child_context()
+    # context.display_stack()
+
+    assert isinstance(fd.fn_code_block.statements, list) and fd.fn_code_block.statements is not None, fd.fn_code_block
+
+    # bind the parameters straight to the argument values.  These have
+    # already been checked against the parameter types.
+    env = context.env
+    for (name, expected), value in zip(_parameters[fd], arguments):
+        env[name] = Slot('var', expected, value)
+
+    # execute statement(s) in the code block.  A return statement, however
+    # deeply it is nested, comes back as a Flow holding the result.
+    for statement in fd.fn_code_block.statements:
+        if statement:
+            try:
+                status = statement.interpret(context)
+            except _FlowEscape as escape:
+                status = escape.flow
+            if type(status) is Flow:
+                if status is BREAK or status is CONTINUE:
+                    raise RuntimeError(f'interp.py --> break/continue outside of a loop in {fd.name.value}() function definition')
+                return status.value
         else:
-            raise RuntimeError(f'interp.py --> Number of arguments in the call to func {node.name.value}() mismatches the func definition')
+            raise RuntimeError(f'interp.py --> Encountered a None statement in {fd.name}() function definition! Check AST')
 
-        # execute statement(s) in the code block
-        for statement in fd.fn_code_block.statements:
-            if statement:
+    # restore the saved context into current
+    context = save_current_context
 
-                # Special case for handling Wabbit Return statement
-                if isinstance(statement, FunctionReturn):
+    # Function had no Return statement
+    # Is this acceptable?
+    return None
 
-                    assert isinstance(statement.expression, Expression), statement.expression
-                    return_type, return_value = interpret(statement.expression, context)
 
-                    # restore the saved context into current
-                    context = save_current_context
+def _interp_FunctionReturn(node, context):
 
-                    # print('stack after restore, before the return statement')
-                    # context.display_stack()
+    assert isinstance(node.expression, Expression), node.expression
+    return Flow(node.expression.interpret(context))
 
-                    return return_type, return_value
 
-                # Process regular statements
-                else:
+# The two logical operators, given the value of the left side.  The
+# right side is only interpreted if it decides the result.
+def _logical_or(left, node, context):
+    return left if left else node.right.interpret(context)
 
-                    return_type, return_value = None, None
 
-                    try:
-                        interpret(statement, context)
-                    except FunctionReturnFlowBreaker as e0:
-                        return_type, return_value = e0.get_payload()
-                        # print('unpacked from e0 ==>', return_type, return_value)
-                        return return_type, return_value
+def _logical_and(left, node, context):
+    return node.right.interpret(context) if left else left
 
-            else:
-                raise RuntimeError(f'interp.py --> Encountered a None statement in {fd.name}() function definition! Check AST')
 
-        # restore the saved context into current
-        context = save_current_context
+_logical_ops = {
+    '||': _logical_or,
+    '&&': _logical_and,
+}
 
-        # Function had no Return statement
-        # Is this acceptable?
-        return None
 
-    elif isinstance(node, FunctionReturn):
+def _interp_LogicalOp(node, context):
+    left = node.left.interpret(context)
+    if type(left) is not bool:
+        raise RuntimeError(f'Type error in logical operator')
 
-        assert isinstance(node.expression, Expression), node.expression
-        return_type, return_value = interpret(node.expression, context)
-        raise FunctionReturnFlowBreaker(return_type, return_value)
-
-    elif isinstance(node, LogicalOp):
-        left_type, left_val = interpret(node.left, context)
-        if left_type != 'bool':
-            raise RuntimeError(f'Type error in logical operator')
-
-        # you could add left_type, right_type check, but commenting the code to allow for short-circuit
-        # right_type, right_val = interpret(node.right, context)
-        # if left_type ! = right_type:
-        #   raise RuntimeError(f'Types do not match in logical operator')
-
-        # revised code with short-circuit
-        if node.op == '||':
-            return (left_type, left_val) if left_val else interpret(node.right, context)
-        elif node.op == '&&':
-            return interpret(node.right, context) if left_val else (left_type, left_val)
-        else:
-            raise RuntimeError("Bad logical op")
+    # you could add left_type, right_type check, but commenting the code to allow for short-circuit
+    # right_type, right_val = node.right.interpret(context)
+    # if left_type ! = right_type:
+    #   raise RuntimeError(f'Types do not match in logical operator')
 
-    elif isinstance(node, Assignment):
-        right_type, right_value = interpret(node.value, context)
-        # print('Assignment right side =>', right_type, right_value)
-        left_kind, left_type, left_value = context.lookup(node.location.value)
-        if left_kind == 'const':
-            raise RuntimeError(f"Constant values cannot be changed - {node.location.value}")
-        if left_type != right_type:
-            raise RuntimeError(f"Type mismatch in assignment operation - {node.location.value}")
-        # print('Left side before the assignment =>', node.location.value, left_kind, left_type, right_value)
-        context.assign(node.location.value, (left_kind, left_type, right_value))
-        # print('Left side after the assignment =>', node.location.value, left_kind, left_type, right_value)
-        # context.display_stack()
-        return left_type, left_value
+    # revised code with short-circuit
+    try:
+        evaluate = _logical_ops[node.op]
+    except KeyError:
+        raise RuntimeError("Bad logical op") from None
+    return evaluate(left, node, context)
 
-    elif isinstance(node, IfStatement):
 
-        condition_test_type, condition_test_value = interpret(node.test, context)
-        if condition_test_type != 'bool':
-            raise RuntimeError("Test in an If-statement must be a bool")
+def _interp_Assignment(node, context):
+    right_value = node.value.interpret(context)
+    slot = _lookup_slot(node.location, context)
+    if slot.kind == 'const':
+        raise RuntimeError(f"Constant values cannot be changed - {node.location.value}")
+    if slot.type != _wabbit_types.get(type(right_value)):
+        raise RuntimeError(f"Type mismatch in assignment operation - {node.location.value}")
+    left_value = slot.value
+    slot.value = right_value
+    # context.display_stack()
+    return left_value
 
-        if condition_test_value:
-            interpret(node.consequence, context.spawn_child_context())
-        else:
-            if node.alternative:
-                if node.alternative.statements:
-                    interpret(node.alternative, context.spawn_child_context())
 
-        return None
+# Whether a list of statements declares anything of its own.  One that
+# doesn't can run in the enclosing context instead of a new child scope.
+_declarations = (VarDeclaration, ConstDeclaration, FunctionDefinition)
+_needs_scope = {}     # Block/Compound -> True/False
 
-    elif isinstance(node, ExprStatement):
-        # returning value is especially helpful if you enclose a compound statement within ExprStatement
-        return interpret(node.value, context)
 
-    elif isinstance(node, WhileStatement):
-        # nc = context.spawn_child_context()
-        while True:
-            condition_test_type, condition_test_value = interpret(node.test, context)
-            if condition_test_type != 'bool':
-                raise RuntimeError("Test in a While-statement must be a bool")
-            if condition_test_value:
-                try:
-                    interpret(node.body, context)
-                except Break:
+def _scope_for(node, context):
+    needs_scope = _needs_scope.get(node)
+    if needs_scope is None:
+        needs_scope = _needs_scope[node] = any(isinstance(statement, _declarations)
+                                               for statement in node.statements)
+    return context.spawn_child_context() if needs_scope else context
+
+
+def _interp_IfStatement(node, context):
+
+    condition_test_value = node.test.interpret(context)
+    if type(condition_test_value) is not bool:
+        raise RuntimeError("Test in an If-statement must be a bool")
+
+    if condition_test_value:
+        return node.consequence.interpret(_scope_for(node.consequence, context))
+    else:
+        if node.alternative:
+            if node.alternative.statements:
+                return node.alternative.interpret(_scope_for(node.alternative, context))
+
+    return None
+
+
+def _interp_ExprStatement(node, context):
+    # returning value is especially helpful if you enclose a compound statement within ExprStatement
+    return node.value.interpret(context)
+
+
+def _interp_WhileStatement(node, context):
+    # nc = context.spawn_child_context()
+    # The body's statements are run right here rather than through
+    # Block, saving a level of calls on every pass through the loop.
+    test = node.test
+    statements = node.body.statements
+    if not statements:
+        raise RuntimeError(f"Nothing to interpret in Block {node.body}")
+    if None in statements:
+        raise RuntimeError('interp.py --> encountered a None statement')
+    while True:
+        condition_test_value = test.interpret(context)
+        if type(condition_test_value) is not bool:
+            raise RuntimeError("Test in a While-statement must be a bool")
+        if not condition_test_value:
+            break
+        try:
+            for statement in statements:
+                status = statement.interpret(context)
+                if type(status) is Flow:
                     break
-                except Continue:
-                    continue
             else:
-                break
-        return None
+                continue
+        except _FlowEscape as escape:
+            status = escape.flow
+        if status is BREAK:
+            break
+        if status is not CONTINUE:
+            # a return from inside the loop
+            return status
+    return None
 
-    elif isinstance(node, BreakStatement):
-        raise Break()
 
-    elif isinstance(node, ContinueStatement):
-        raise Continue()
+def _interp_BreakStatement(node, context):
+    return BREAK
+
+
+def _interp_ContinueStatement(node, context):
+    return CONTINUE
 
-    elif isinstance(node, Compound):
-        # print('Entered compound statement')
-        child_context=context.spawn_child_context()
-        statements = node.statements
 
-        for statement in statements[:-1]:
-            interpret(statement, child_context)
+def _interp_Compound(node, context):
+    # print('Entered compound statement')
+    child_context = _scope_for(node, context)
+    statements = node.statements
 
-        # last statement should be an expression returning values. Therefore, ensure last statement of
-        # a compound statement is never within an ExprStatement
-        return interpret(statements[-1], child_context)
+    # last statement should be an expression returning values. Therefore, ensure last statement of
+    # a compound statement is never within an ExprStatement
+    for statement in statements:
+        value = statement.interpret(child_context)
+        if type(value) is Flow:
+            raise _FlowEscape(value)
+    return value
 
-    elif isinstance(node, Block):
-        if node.statements:
+
+def _interp_Block(node, context):
+    if node.statements:
+        try:
             for statement in node.statements:
                 if statement:
-                    interpret(statement, context)
+                    status = statement.interpret(context)
+                    if type(status) is Flow:
+                        return status
                 else:
                     raise RuntimeError('interp.py --> encountered a None statement')
-        else:
-            raise RuntimeError(f"Nothing to interpret in Block {node}")
-        return None
-
+        except _FlowEscape as escape:
+            return escape.flow
     else:
+        raise RuntimeError(f"Nothing to interpret in Block {node}")
+    return None
+
+
+# Handler for each class of node.  Model classes aren't subclassed, so
+# the exact type of a node is enough to find its handler.
+_HANDLERS = {
+    Integer: _interp_Integer,
+    Float: _interp_Float,
+    PrintStatement: _interp_PrintStatement,
+    Boolean: _interp_Boolean,
+    Char: _interp_Char,
+    Name: _interp_Name,
+    BinOp: _interp_BinOp,
+    RelOp: _interp_RelOp,
+    UnaryOp: _interp_UnaryOp,
+    Grouped: _interp_Grouped,
+    ConstDeclaration: _interp_ConstDeclaration,
+    VarDeclaration: _interp_VarDeclaration,
+    FunctionDefinition: _interp_FunctionDefinition,
+    FunctionApplication: _interp_FunctionApplication,
+    FunctionReturn: _interp_FunctionReturn,
+    LogicalOp: _interp_LogicalOp,
+    Assignment: _interp_Assignment,
+    IfStatement: _interp_IfStatement,
+    ExprStatement: _interp_ExprStatement,
+    WhileStatement: _interp_WhileStatement,
+    BreakStatement: _interp_BreakStatement,
+    ContinueStatement: _interp_ContinueStatement,
+    Compound: _interp_Compound,
+    Block: _interp_Block,
+}
+
+
+def _interp_unknown(node, context):
+    raise RuntimeError(f"No interp handler for {node} of type {str(type(node))}")
+
+
+# Each class of node interprets itself: the handlers become the
+# interpret() method of their class, so a node is run with
+# node.interpret(context).  Anything without a handler of its own
+# gets the error above.
+Node.interpret = _interp_unknown
+for _cls, _handler in _HANDLERS.items():
+    _cls.interpret = _handler
+
 
-        raise RuntimeError(f"No interp handler for {node} of type {str(type(node))}")
+# Interpret a node in the environment by handing it to the handler
+# for its class.
+
+def interpret(node, context):
+    try:
+        handler = _HANDLERS[type(node)]
+    except KeyError:
+        raise RuntimeError(f"No interp handler for {node} of type {str(type(node))}") from None
+    return handler(node, context)
 
 
 def interpret_assignment_lhs(node, context, assigned_value):
     if isinstance(node, Name):
-        valtype, value = assigned_value
-        kind, decltype, _ = context.lookup(node.value)
-        if kind == 'const':
+        valtype, value = _wabbit_types.get(type(assigned_value)), assigned_value
+        slot = context.lookup(node.value)
+        if slot.kind == 'const':
             raise RuntimeError("Can't assign to const")
-        if valtype != decltype:
-            raise RuntimeError(f"Type error in assignment. {decltype} = {valtype}")
-        context.assign(node.value, (kind, valtype, value))
-        return (valtype, value)
+        if valtype != slot.type:
+            raise RuntimeError(f"Type error in assignment. {slot.type} = {valtype}")
+        slot.value = value
+        return value
         ...
     # elif isinstance(node, Array):
     #    ...
     else:
         raise RuntimeError(f"Can't assign to {node}")
 
-class Break(Exception):
-    pass
 
+# ----------------------------------------------------------------------
+# Compiling hot functions
+#
+# Walking the model is slow for number crunching functions that are
+# called over and over (in_mandelbrot() in the Mandelbrot programs).
+# Once a function has been called HOT_CALL_COUNT times, it is written
+# out as Python source and compiled, with Numba's njit if Numba is
+# installed.  Later calls go straight to the compiled function.
+#
+# Only plain arithmetic is handled: int/float/bool parameters, locals
+# and result, if, while, break/continue and return, plus global
+# constants.  Anything else (printing, calls, chars, global variables,
+# a declaration that a while loop would repeat, a path that falls off
+# the end) keeps the function in the interpreter, where the usual
+# errors get reported.
+#
+# Under Numba ints are 64 bits wide, while the interpreter's never
+# overflow.  Compiled integer arithmetic goes through the checked
+# operations below, which raise OverflowError instead of wrapping
+# around, and so does passing an argument too big for 64 bits.  Either
+# way that call is run again by the interpreter, so a function gives
+# the same result before and after it gets hot.
+
+HOT_CALL_COUNT = 50
 
-class Continue(Exception):
+_call_counts = {}     # FunctionDefinition -> number of calls so far
+_native = {}          # FunctionDefinition -> compiled function, or False
+
+_native_types = {'int': 'int64', 'float': 'float64', 'bool': 'boolean'}
+
+
+class _NotNative(Exception):
     pass
 
 
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+
+
+# Each one checks its operands before doing anything, since a test on a
+# result that has already wrapped around is the kind of thing LLVM is
+# allowed to optimize away.  As plain Python they raise for results
+# Python could have handled, but that only sends the call back to the
+# interpreter.
+def _int_add(a, b):
+    if (b > 0 and a > _INT64_MAX - b) or (b < 0 and a < _INT64_MIN - b):
+        raise OverflowError('integer overflow')
+    return a + b
+
+
+def _int_sub(a, b):
+    if (b < 0 and a > _INT64_MAX + b) or (b > 0 and a < _INT64_MIN + b):
+        raise OverflowError('integer overflow')
+    return a - b
+
+
+# For operands of opposite signs the limit is _INT64_MIN / |b| (or / a),
+# which // rounds down; when the division isn't exact, an operand equal
+# to the rounded-down limit still fits.
+def _int_mul(a, b):
+    over = False
+    if a > 0 and b > 0:
+        over = a > _INT64_MAX // b
+    elif a > 0 and b < 0:
+        q = _INT64_MIN // a
+        over = b < q or (b == q and _INT64_MIN % a != 0)
+    elif a < 0 and b > 0:
+        q = _INT64_MIN // b
+        over = a < q or (a == q and _INT64_MIN % b != 0)
+    elif a < 0 and b < 0:
+        q = _INT64_MAX // b
+        over = a < q or (a == q and _INT64_MAX % b != 0)
+    if over:
+        raise OverflowError('integer overflow')
+    return a * b
+
+
+def _int_div(a, b):
+    if a == _INT64_MIN and b == -1:
+        raise OverflowError('integer overflow')
+    return a // b
+
+
+def _int_neg(a):
+    if a == _INT64_MIN:
+        raise OverflowError('integer overflow')
+    return -a
+
+
+_int_ops = {'+': '_int_add', '-': '_int_sub', '*': '_int_mul', '/': '_int_div'}
+
+# The checked operations as seen by compiled functions, with the
+# Numba-compiled versions swapped in once Numba has been loaded
+_int_helpers = {
+    '_int_add': _int_add,
+    '_int_sub': _int_sub,
+    '_int_mul': _int_mul,
+    '_int_div': _int_div,
+    '_int_neg': _int_neg,
+}
+_jitted_int_helpers = {}
+
+
+def compile_function(fd, context):
+    '''
+    Return a compiled function doing the same as the FunctionDefinition
+    fd, or None if fd can't be compiled.  Global constants are looked
+    up in context.
+    '''
+    try:
+        source = _NativeWriter(fd, context.root).write()
+    except _NotNative:
+        return None
+    namespace = dict(_int_helpers)
+    exec(source, namespace)
+    function = namespace['native']
+    # Numba is optional, and slow to import, so it's only loaded once
+    # something gets hot
+    try:
+        from numba import njit
+    except ImportError:
+        return function
+    if not _jitted_int_helpers:
+        _jitted_int_helpers.update((name, njit(helper)) for name, helper in _int_helpers.items())
+    namespace.update(_jitted_int_helpers)
+    arguments = ', '.join(_native_types[parameter.type.name]
+                          for parameter in fd.fn_parameters.parameters_list)
+    try:
+        return njit(f'{_native_types[fd.fn_return_type.name]}({arguments})')(function)
+    except Exception:
+        return function
+
+
+class _NativeWriter:
+    '''
+    Writes the Python source for one function.  Raises _NotNative on
+    anything it doesn't handle.  Every Wabbit variable gets its own
+    Python name, so shadowing in nested blocks works out.
+    '''
+
+    def __init__(self, fd, root):
+        self.fd = fd
+        self.root = root
+        self.lines = []
+        self.scopes = [{}]
+        self.loop_scope = None    # scope of the innermost while body
+        self.count = 0
+
+    def write(self):
+        fd = self.fd
+        if fd.fn_return_type.name not in _native_types:
+            raise _NotNative()
+        names = []
+        for parameter in fd.fn_parameters.parameters_list:
+            if parameter.type.name not in _native_types or parameter.initializer:
+                raise _NotNative()
+            names.append(self.declare(parameter.name, parameter.type.name, 'var'))
+        statements = fd.fn_code_block.statements
+        if not _always_returns(statements):
+            raise _NotNative()
+        self.lines.append(f"def native({', '.join(names)}):")
+        self.statements(statements, '    ')
+        return '\n'.join(self.lines) + '\n'
+
+    def declare(self, name, value_type, kind):
+        if name in self.scopes[-1]:
+            raise _NotNative()
+        pyname = f'v{self.count}'
+        self.count += 1
+        self.scopes[-1][name] = (pyname, value_type, kind)
+        return pyname
+
+    # Find a name as (python source, type, kind)
+    def resolve(self, name):
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        slot = self.root.env.get(name)
+        if slot is None or slot.kind != 'const' or slot.type not in _native_types:
+            raise _NotNative()
+        return repr(slot.value), slot.type, slot.kind
+
+    def statements(self, statements, indent):
+        if not statements:
+            raise _NotNative()
+        for statement in statements:
+            self.statement(statement, indent)
+
+    def block(self, statements, indent):
+        self.scopes.append({})
+        self.statements(statements, indent)
+        self.scopes.pop()
+
+    def statement(self, node, indent):
+        emit = self.lines.append
+        if isinstance(node, (ConstDeclaration, VarDeclaration)):
+            # The interpreter rejects these the second time round a loop
+            if self.scopes[-1] is self.loop_scope:
+                raise _NotNative()
+            if node.initializer:
+                value_type, value = self.expression(node.initializer)
+            elif isinstance(node, VarDeclaration) and node.type and node.type.name in _native_types:
+                value_type, value = node.type.name, repr(_default_type_values[node.type.name])
+            else:
+                raise _NotNative()
+            kind = 'const' if isinstance(node, ConstDeclaration) else 'var'
+            emit(f'{indent}{self.declare(node.name, value_type, kind)} = {value}')
+        elif isinstance(node, ExprStatement):
+            self.statement(node.value, indent)
+        elif isinstance(node, Assignment):
+            pyname, left_type, kind = self.resolve(node.location.value)
+            right_type, value = self.expression(node.value)
+            if kind != 'var' or left_type != right_type:
+                raise _NotNative()
+            emit(f'{indent}{pyname} = {value}')
+        elif isinstance(node, IfStatement):
+            emit(f'{indent}if {self.test(node.test)}:')
+            self.block(node.consequence.statements, indent + '    ')
+            if node.alternative and node.alternative.statements:
+                emit(f'{indent}else:')
+                self.block(node.alternative.statements, indent + '    ')
+        elif isinstance(node, WhileStatement):
+            emit(f'{indent}while {self.test(node.test)}:')
+            outer, self.loop_scope = self.loop_scope, self.scopes[-1]
+            self.statements(node.body.statements, indent + '    ')
+            self.loop_scope = outer
+        elif isinstance(node, (BreakStatement, ContinueStatement)):
+            if self.loop_scope is None:
+                raise _NotNative()
+            emit(indent + ('break' if isinstance(node, BreakStatement) else 'continue'))
+        elif isinstance(node, FunctionReturn):
+            value_type, value = self.expression(node.expression)
+            if value_type != self.fd.fn_return_type.name:
+                raise _NotNative()
+            emit(f'{indent}return {value}')
+        elif isinstance(node, Expression):
+            emit(f'{indent}{self.expression(node)[1]}')
+        else:
+            raise _NotNative()
+
+    def test(self, node):
+        test_type, test = self.expression(node)
+        if test_type != 'bool':
+            raise _NotNative()
+        return test
+
+    # Python source for an expression as (type, source)
+    def expression(self, node):
+        if isinstance(node, Integer):
+            return 'int', repr(int(node.value))
+        elif isinstance(node, Float):
+            return 'float', repr(float(node.value))
+        elif isinstance(node, Boolean):
+            return 'bool', repr(node.value == 'true')
+        elif isinstance(node, Name):
+            pyname, value_type, kind = self.resolve(node.value)
+            return value_type, pyname
+        elif isinstance(node, Grouped):
+            return self.expression(node.value)
+        elif isinstance(node, BinOp):
+            left_type, left = self.expression(node.left)
+            right_type, right = self.expression(node.right)
+            if left_type != right_type or node.op not in _binops.get(_python_types[left_type], ()):
+                raise _NotNative()
+            if left_type == 'int':
+                return left_type, f'{_int_ops[node.op]}({left}, {right})'
+            return left_type, f'({left} {node.op} {right})'
+        elif isinstance(node, RelOp):
+            left_type, left = self.expression(node.left)
+            right_type, right = self.expression(node.right)
+            if left_type != right_type or node.op not in _relops.get(_python_types[left_type], ()):
+                raise _NotNative()
+            return 'bool', f'({left} {node.op} {right})'
+        elif isinstance(node, LogicalOp):
+            op = {'||': 'or', '&&': 'and'}.get(node.op)
+            if op is None:
+                raise _NotNative()
+            return 'bool', f'({self.test(node.left)} {op} {self.test(node.right)})'
+        elif isinstance(node, UnaryOp):
+            value_type, value = self.expression(node.value)
+            if value_type == 'bool':
+                return value_type, f'(not {value})'
+            elif value_type == 'int' and node.op == '-':
+                return value_type, f'_int_neg({value})'
+            elif value_type in {'int', 'float'} and node.op in {'+', '-'}:
+                return value_type, f'({node.op}{value})'
+        raise _NotNative()
+
+
+# Does running these statements always end in a return?
+def _always_returns(statements):
+    for statement in statements:
+        if isinstance(statement, FunctionReturn):
+            return True
+        if (isinstance(statement, IfStatement) and statement.alternative
+                and _always_returns(statement.consequence.statements)
+                and _always_returns(statement.alternative.statements)):
+            return True
+    return False
+
+
+# ----------------------------------------------------------------------
+# Memoizing pure functions
+#
+# A function whose result only depends on its arguments is run once
+# for each set of argument values; later calls with the same values
+# get the saved result.  That turns recursive functions like fib()
+# from exponential into linear time.  A function counts as pure if it
+# doesn't print, only assigns to its own parameters and locals, reads
+# nothing but those and global constants, and only calls pure
+# functions.  Each memo keeps the MEMO_SIZE most recently used results.
+#
+# Floats are keyed by their repr().  -0.0 == 0.0, so f(-0.0) would
+# otherwise get the result of f(0.0), and a nan would never be found.
+
+MEMO_SIZE = 10000
+
+_pure_functions = {}  # FunctionDefinition -> True/False
+_memos = {}           # FunctionDefinition -> OrderedDict {argument values: result}
+
+
+def is_pure(fd, context):
+    '''
+    Check whether calls to the FunctionDefinition fd can be memoized.
+    Globals and other functions are looked up in context.
+    '''
+    return _pure_function(fd, context.root, set())
+
+
+# active holds the functions being checked further up, which are
+# taken to be pure so that recursion can be checked at all
+def _pure_function(fd, root, active):
+    if fd in active:
+        return True
+    active = active | {fd}
+    scopes = [{parameter.name for parameter in fd.fn_parameters.parameters_list}]
+    return _pure_statements(fd.fn_code_block.statements, scopes, root, active)
+
+
+def _pure_statements(statements, scopes, root, active):
+    return all(_pure(statement, scopes, root, active) for statement in statements)
+
+
+def _pure(node, scopes, root, active):
+    if isinstance(node, (Integer, Float, Boolean, Char, BreakStatement, ContinueStatement)):
+        return True
+    elif isinstance(node, Name):
+        if any(node.value in scope for scope in scopes):
+            return True
+        slot = root.env.get(node.value)
+        return slot is not None and slot.kind == 'const'
+    elif isinstance(node, (BinOp, RelOp, LogicalOp)):
+        return _pure(node.left, scopes, root, active) and _pure(node.right, scopes, root, active)
+    elif isinstance(node, (UnaryOp, Grouped, ExprStatement)):
+        return _pure(node.value, scopes, root, active)
+    elif isinstance(node, FunctionReturn):
+        return _pure(node.expression, scopes, root, active)
+    elif isinstance(node, Assignment):
+        return (any(node.location.value in scope for scope in scopes)
+                and _pure(node.value, scopes, root, active))
+    elif isinstance(node, (ConstDeclaration, VarDeclaration)):
+        if node.initializer and not _pure(node.initializer, scopes, root, active):
+            return False
+        scopes[-1].add(node.name)
+        return True
+    elif isinstance(node, IfStatement):
+        return (_pure(node.test, scopes, root, active)
+                and _pure_statements(node.consequence.statements, scopes + [set()], root, active)
+                and (not node.alternative
+                     or _pure_statements(node.alternative.statements, scopes + [set()], root, active)))
+    elif isinstance(node, WhileStatement):
+        return (_pure(node.test, scopes, root, active)
+                and _pure_statements(node.body.statements, scopes, root, active))
+    elif isinstance(node, Compound):
+        return _pure_statements(node.statements, scopes + [set()], root, active)
+    elif isinstance(node, FunctionApplication):
+        slot = root.env.get(node.name.value)
+        return (slot is not None and slot.kind == 'func'
+                and _pure_statements(node.fn_arguments.arguments_list, scopes, root, active)
+                and _pure_function(slot.value, root, active))
+    # printing, nested definitions and anything unknown
+    return False
+
+
 # Making interpret a first-class program here
 
 if __name__ == '__main__':
@@ -48,6 +48,17 @@
 # use basic data structures. You can add usability enhancements later.
 # -----------------------------------------------------------------------------
 
+import operator
+import sys
+
+# NumPy and Numba are optional.  Without them the flattened model below
+# uses plain lists and is walked by ordinary Python.
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:
+    np = njit = None
+
 NoneType = type(None)
 
 # The following classes are used for the expression example in test_models.py.
@@ -55,21 +66,32 @@ NoneType = type(None)
 # if you want to go in a different direction with it.
 
 class Node:
-    def __init__(self):
-        self.id = ...   # Primary-key (unique)
+    __slots__ = ('_repr',)
+
+    # Nodes aren't changed once built, so each one's repr is worked out
+    # by _describe() the first time it's asked for and then kept.
+    def __repr__(self):
+        try:
+            return self._repr
+        except AttributeError:
+            self._repr = self._describe()
+            return self._repr
+
+    def _describe(self):
+        return object.__repr__(self)
 
 # Expressions represent values.   Eg. BinOp
 class Expression(Node):
-    pass
+    __slots__ = ()
 
 # Statement represents an "action". Not a value. Eg. print.
 class Statement(Node):
-    pass
+    __slots__ = ()
 
 # A declaration is a special kind of statement that additionally declares
 # the existence of a name.
 class Declaration(Statement):
-    pass
+    __slots__ = ()
 
 # --- Expressions
 
@@ -77,95 +99,108 @@ class Integer(Expression):
     '''
     Example: 42
     '''
+    __slots__ = ('value', '_src')
+
     def __init__(self, value):
-        assert isinstance(value, str), value
-        self.value = value
+        assert isinstance(value, (str, int)), value
+        self.value = int(value) if isinstance(value, str) else value
+        self._src = None    # to_source() text, once worked out
 
-    def __repr__(self):
+    def _describe(self):
         return f'Integer({self.value})'
 
 class Float(Expression):
     '''
     Example: 4.2
     '''
+    __slots__ = ('value', '_src')
+
     def __init__(self, value):
-        assert isinstance(value, str), value        
-        self.value = value
+        assert isinstance(value, (str, float)), value
+        self.value = float(value) if isinstance(value, str) else value
+        self._src = None    # to_source() text, once worked out
 
-    def __repr__(self):
+    def _describe(self):
         return f'Float({self.value})'
 
 class Boolean(Expression):
     '''
     Example: true, false
     '''
+    __slots__ = ('value',)
+
     def __init__(self, value):
         assert value in {'true', 'false'}, value
         self.value = value
 
-    def __repr__(self):
+    def _describe(self):
         return f'Boolean({self.value})'
     
 class Name(Expression):
     '''
     Example: x
     '''
+    __slots__ = ('value',)
+
     def __init__(self, value):
         assert isinstance(value, str), value        
         self.value = value
 
-    def __repr__(self):
+    def _describe(self):
         return f'Name({self.value})'
     
-class BinOp(Expression):
-    '''
-    Example: left + right
-    '''
+# BinOp and RelOp hold the same three parts and only differ in which
+# operators they take, so they share one implementation.
+class _BinaryOperator(Expression):
+    __slots__ = ('op', 'left', 'right')
+
     def __init__(self, op, left:Expression, right:Expression):
         assert isinstance(left, Expression), left
         assert isinstance(right, Expression), right
-        self.op = op
+        self.op = sys.intern(op)
         self.left = left
         self.right = right
 
-    def __repr__(self):
-        return f'BinOp({self.op}, {self.left}, {self.right})'
+    def _describe(self):
+        return f'{type(self).__name__}({self.op}, {self.left}, {self.right})'
 
-class RelOp(Expression):
+class BinOp(_BinaryOperator):
     '''
-    Example: left < right
+    Example: left + right
     '''
-    def __init__(self, op, left:Expression, right:Expression):
-        assert isinstance(left, Expression), left
-        assert isinstance(right, Expression), right
-        self.op = op
-        self.left = left
-        self.right = right
+    __slots__ = ()
 
-    def __repr__(self):
-        return f'RelOp({self.op}, {self.left}, {self.right})'
+class RelOp(_BinaryOperator):
+    '''
+    Example: left < right
+    '''
+    __slots__ = ()
     
 class UnaryOp(Expression):
     '''
     Example: -value
     '''
+    __slots__ = ('op', 'value')
+
     def __init__(self, op, value):
         assert isinstance(value, Expression), value
-        self.op = op
+        self.op = sys.intern(op)
         self.value = value
 
-    def __repr__(self):
+    def _describe(self):
         return f'UnaryOp({self.op}, {self.value})'
 
 class Grouped(Expression):
     '''
     Example: ( value )
     '''
+    __slots__ = ('value',)
+
     def __init__(self, value):
         assert isinstance(value, Expression), value        
         self.value = value
 
-    def __repr__(self):
+    def _describe(self):
         return f'Grouped({self.value})'
 
 
@@ -173,13 +208,15 @@ class Assignment(Expression):
     '''
     Example: x = 2 + 3
     '''
+    __slots__ = ('location', 'value')
+
     def __init__(self, location, value):
         assert isinstance(location, Expression), location
         assert isinstance(value, Expression), value        
         self.location = location
         self.value = value
 
-    def __repr__(self):
+    def _describe(self):
         return f'Assignment({self.location}, {self.value})'
 
 
@@ -189,11 +226,13 @@ class Compound(Expression):
     
     x = { stmt1; stmt2; ...; expr }
     '''
+    __slots__ = ('statements',)
+
     def __init__(self, statements):
         assert isinstance(statements, list) and len(statements) > 0, statements
         self.statements = statements
 
-    def __repr__(self):
+    def _describe(self):
         return f'Compound({self.statements})'
     
 # -- Statements
@@ -206,22 +245,26 @@ class ExprStatement(Statement):
     2 + 3;
     x;
     '''
+    __slots__ = ('value',)
+
     def __init__(self, value):
         assert isinstance(value, Expression), value
         self.value = value
 
-    def __repr__(self):
+    def _describe(self):
         return f'ExprStatement({self.value})'
     
 class PrintStatement(Statement):
     '''
     Example: print value;
     '''
+    __slots__ = ('value',)
+
     def __init__(self, value):
         assert isinstance(value, Expression), value        
         self.value = value
 
-    def __repr__(self):
+    def _describe(self):
         return f'PrintStatement({self.value})'
 
 
@@ -231,6 +274,8 @@ class IfStatement(Statement):
     if test { consequence }
     if test { consequence } else { alternative }
     '''
+    __slots__ = ('test', 'consequence', 'alternative')
+
     def __init__(self, test, consequence, alternative):
         assert isinstance(test, Expression), test
         assert isinstance(consequence, Block), consequence
@@ -239,20 +284,22 @@ class IfStatement(Statement):
         self.consequence = consequence
         self.alternative = alternative
 
-    def __repr__(self):
+    def _describe(self):
         return f'IfStatement({self.test}, {self.consequence}, {self.alternative})'
 
 class WhileStatement(Statement):
     '''
     while test { statements }
     '''
+    __slots__ = ('test', 'body')
+
     def __init__(self, test, body):
         assert isinstance(test, Expression), test
         assert isinstance(body, Block), body
         self.test = test
         self.body = body
 
-    def __repr__(self):
+    def _describe(self):
         return f'WhileStatement({self.test}, {self.body})'
     
 # -- Declarations
@@ -264,12 +311,14 @@ class ConstDeclaration(Declaration):
               const tau = 2.0 * pi; 
     Immutable.
     '''
+    __slots__ = ('name', 'type', 'initializer')
+
     def __init__(self, name, type, initializer):
         self.name = name
         self.type = type    # Optional
         self.initializer = initializer
 
-    def __repr__(self):
+    def _describe(self):
         return f'ConstDeclaration({self.name}, {self.type}, {self.initializer})'
 
 class VarDeclaration(Declaration):
@@ -278,19 +327,25 @@ class VarDeclaration(Declaration):
               var n int;     // Initialization optional. 
     Mutable. 
     '''
+    __slots__ = ('name', 'type', 'initializer')
+
     def __init__(self, name, type, initializer):
         self.name = name
         self.type = type    # Optional
         self.initializer = initializer   # Optional
 
-    def __repr__(self):
+    def _describe(self):
         return f'VarDeclaration({self.name}, {self.type}, {self.initializer})'
 
 class BreakStatement(Statement):
+    __slots__ = ()
+
     def __repr__(self):
         return f'BreakStatement()'
 
 class ContinueStatement(Statement):
+    __slots__ = ()
+
     def __repr__(self):
         return f'ContinueStatement()'
     
@@ -300,6 +355,8 @@ class Block(Node):
     '''
     Zero or more statements
     '''
+    __slots__ = ('statements',)
+
     def __init__(self, statements):
         self.statements = statements
 
@@ -307,28 +364,37 @@ class Type(Node):
     '''
     A typename like "int", "float", etc.
     '''
+    __slots__ = ('name',)
+
     def __init__(self, name):
         self.name = name
 
-    def __repr__(self):
+    def _describe(self):
         return f'Type({self.name})'
 
 
 class FnDeclaration(Statement):
+    __slots__ = ('name', 'fn_parameters', 'fn_return_type', 'fn_code_block')
 
     def __init__(self, name, fn_parameters,fn_return_type, fn_code_block=None):
         assert isinstance(fn_return_type, Type), fn_return_type
         #assert isinstance(fn_code_block, Block), fn_code_block
         self.name = name.value
+        # A plain list of FnParameter.  An FnParameters wrapper is still
+        # accepted and unwrapped.
+        if isinstance(fn_parameters, FnParameters):
+            fn_parameters = fn_parameters.parameters_list
+        assert isinstance(fn_parameters, list), fn_parameters
         self.fn_parameters = fn_parameters
         self.fn_return_type = fn_return_type
         self.fn_code_block = fn_code_block
 
-    def __repr__(self):
+    def _describe(self):
         return f'FunctionDeclaration({self.name})'
 
 
 class FnParameters:
+    __slots__ = ('parameters_list',)
 
     def __init__(self, parameters_list):
         assert isinstance(parameters_list, list), parameters_list
@@ -336,16 +402,18 @@ class FnParameters:
 
 
 class FnParameter(Declaration):
+    __slots__ = ('param_declaration',)
 
     def __init__(self, param_declaration):
         assert isinstance(param_declaration, VarDeclaration), param_declaration
         self.param_declaration = param_declaration
 
-    def __repr__(self):
+    def _describe(self):
         return f'FunctionParameter{self.param_declaration}'
 
 
 class FnReturn(Statement):
+    __slots__ = ('expression',)
 
     def __init__(self, expression):
         assert isinstance(expression, Expression), expression
@@ -353,6 +421,7 @@ class FnReturn(Statement):
 
 
 class FnCall(Expression):
+    __slots__ = ('name', 'expression')
 
     def __init__(self, name, expression):
         self.name = name
@@ -360,7 +429,95 @@ class FnCall(Expression):
 
 
 class FnArguments():
-    pass
+    __slots__ = ()
+
+
+# Shared leaf nodes.  Literals and type names carry nothing but their text,
+# so hand-built models can reuse one node per distinct value instead of
+# making a new one every time.  Shared nodes must be treated as read-only.
+# Names are deliberately left out: a name means different things in
+# different scopes.
+_leaves = {}
+
+
+# Floats are keyed by their repr(): -0.0 == 0.0, but they are different
+# literals
+def _leaf(cls, value):
+    key = (cls, repr(value) if type(value) is float else value)
+    node = _leaves.get(key)
+    if node is None:
+        node = _leaves[key] = cls(value)
+    return node
+
+
+# Numbers are shared by value, so '7' and '07' give the same node
+def make_integer(value):
+    return _leaf(Integer, int(value))
+
+
+def make_float(value):
+    return _leaf(Float, float(value))
+
+
+def make_boolean(value):
+    return _leaf(Boolean, value)
+
+
+def make_type(name):
+    return _leaf(Type, name)
+
+
+# Operators on two literals of the same numeric type are worked out when
+# the model is built and replaced by the literal they produce.  Integers
+# divide with // and floats with /.  Anything else (mixed types, names,
+# dividing by zero) is left for run time.
+_folded_binops = {
+    Integer: {
+        '+': operator.add,
+        '-': operator.sub,
+        '*': operator.mul,
+        '/': operator.floordiv,
+    },
+    Float: {
+        '+': operator.add,
+        '-': operator.sub,
+        '*': operator.mul,
+        '/': operator.truediv,
+    },
+}
+
+_folded_relops = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '>=': operator.ge,
+    '>': operator.gt,
+    '!=': operator.ne,
+}
+
+
+def make_binop(op, left, right):
+    cls = type(left)
+    fold = _folded_binops.get(cls, {}).get(op)
+    if fold and type(right) is cls and not (op == '/' and right.value == 0):
+        return _leaf(cls, fold(left.value, right.value))
+    return BinOp(op, left, right)
+
+
+def make_relop(op, left, right):
+    fold = _folded_relops.get(op)
+    if fold and type(left) in _folded_binops and type(right) is type(left):
+        return make_boolean('true' if fold(left.value, right.value) else 'false')
+    return RelOp(op, left, right)
+
+
+# Parentheses only say how an expression was written.  The tree already
+# holds the grouping, and to_source() puts back the parentheses that
+# operator precedence calls for, so no Grouped node is needed.  The
+# class is still there for models that build one directly.
+def make_grouped(value):
+    assert isinstance(value, Expression), value
+    return value
 
 
 
@@ -380,105 +537,416 @@ class FnArguments():
 
 # How would you modify to auto-indent the output?
 # Automatically format the code nicely (like gofmt, black, etc.)
-def to_source(node):
-    if isinstance(node, Integer):
-        return str(node.value)
 
-    elif isinstance(node, Float):
-        return str(node.value)
+# The model is walked with an explicit stack instead of recursion, so
+# deeply nested programs can't overflow the Python stack.  Each node's
+# handler (picked out of _HANDLERS by the exact type of the node)
+# appends the pieces of its source to parts, in order: strings to
+# output as they are and child nodes to be converted in their place.
 
-    elif isinstance(node, Boolean):
-        return str(node.value)
-    
-    elif isinstance(node, Name):
-        return node.value
+# A number's text is worked out once and kept on the node.  Literals
+# made by make_integer()/make_float() are shared, so every use of the
+# same number in a program reuses it.
+def _src_Integer(node, parts):
+    src = node._src
+    if src is None:
+        src = node._src = str(node.value)
+    parts.append(src)
 
-    elif isinstance(node, Type):
-        return node.name
-    
-    elif isinstance(node, BinOp):
-        return f'{to_source(node.left)} {node.op} {to_source(node.right)}'
 
-    elif isinstance(node, RelOp):
-        return f'{to_source(node.left)} {node.op} {to_source(node.right)}'
-    
-    elif isinstance(node, UnaryOp):
-        return f'{node.op}{to_source(node.value)}'
+def _src_Float(node, parts):
+    src = node._src
+    if src is None:
+        src = node._src = str(node.value)
+    parts.append(src)
 
-    elif isinstance(node, ExprStatement):
-        return f'{to_source(node.value)};'
-    
-    elif isinstance(node, PrintStatement):
-        return f'print {to_source(node.value)};'
 
-    elif isinstance(node, Grouped):
-        return f'({to_source(node.value)})'
+def _src_Boolean(node, parts):
+    parts.append(str(node.value))
 
-    elif isinstance(node, ConstDeclaration):
-        if node.type:
-            return f'const {node.name} {to_source(node.type)} = {to_source(node.initializer)};'
-        else:
-            return f'const {node.name} = {to_source(node.initializer)};'
 
-    elif isinstance(node, VarDeclaration):
-        if node.type:
-            code = f'var {node.name} {to_source(node.type)}'
-        else:
-            code = f'var {node.name}'
-
-        if node.initializer:
-            code += f' = {to_source(node.initializer)}'
-        return code + ';'
-
-    elif isinstance(node, Assignment):
-        return f'{to_source(node.location)} = {to_source(node.value)}'
-
-    elif isinstance(node, IfStatement):
-        code = f'if {to_source(node.test)} ' + '{\n'
-        code += to_source(node.consequence) + '\n}'
-        if node.alternative:
-            code += ' else {\n'
-            code += to_source(node.alternative)
-            code += '\n}'
-        return code
-
-    elif isinstance(node, WhileStatement):
-        code = f'while {to_source(node.test)} ' + '{\n'
-        code += to_source(node.body) + '\n}'
-        return code
-
-    elif isinstance(node, BreakStatement):
-        return 'break;'
-
-    elif isinstance(node, ContinueStatement):
-        return 'continue;'
-    
-    elif isinstance(node, Block):
-        return '\n'.join([to_source(n) for n in node.statements])
+def _src_Name(node, parts):
+    parts.append(node.value)
 
-    elif isinstance(node, Compound):
-        return '{ ' + ' '.join([to_source(n) for n in node.statements]) + '}'
 
-    elif isinstance(node, FnDeclaration):
-        code = f'func {node.name} '
-        code += '(' + ', '.join([to_source(n) for n in node.fn_parameters.parameters_list]) + ') '
-        code += to_source(node.fn_return_type)
-        code += ' {\n' + to_source(node.fn_code_block) + '\n}\n'
-        return code
+def _src_Type(node, parts):
+    parts.append(node.name)
 
-    elif isinstance(node, FnParameters):
-        return ','.join([to_source(n) for n in node.parameters_list])
 
-    elif isinstance(node, FnParameter):
-        if node.param_declaration.type:
-            return node.param_declaration.name.value + ' ' + to_source(node.param_declaration.type)
+# How tightly each operator binds.  Unary operators bind tighter than
+# any of these.
+_precedence = {
+    '*': 3, '/': 3,
+    '+': 2, '-': 2,
+    '<': 1, '<=': 1, '==': 1, '>=': 1, '>': 1, '!=': 1,
+}
+_UNARY_PRECEDENCE = 4
 
-    elif isinstance(node, FnReturn):
-        return 'return ' + to_source(node.expression) + ' ;'
+# Each binary operator as written between its operands
+_spaced_ops = {op: f' {op} ' for op in _precedence}
 
+
+# An operand of an operator binding with precedence prec, in parentheses
+# if it binds more loosely.  With strict, an operand binding just as
+# tightly gets them too: the right side of any binary operator, or
+# either side of a relation (relations don't chain).  That includes + and
+# *, since regrouping a + (b + c) changes the rounding of floats and
+# a * (b / c) changes what integer division gives.
+def _operand(child, prec, strict, parts):
+    if type(child) in (BinOp, RelOp):
+        child_prec = _precedence.get(child.op, 0)
+        grouped = child_prec < prec or (strict and child_prec == prec)
+    else:
+        grouped = type(child) is Assignment
+    if grouped:
+        parts.append('(')
+        parts.append(child)
+        parts.append(')')
     else:
-        raise RuntimeError(f"Can't convert {node} to source")
+        parts.append(child)
 
 
+def _src_BinOp(node, parts):
+    prec = _precedence.get(node.op, 0)
+    _operand(node.left, prec, False, parts)
+    parts.append(_spaced_ops.get(node.op) or f' {node.op} ')
+    _operand(node.right, prec, True, parts)
 
-    
+
+def _src_RelOp(node, parts):
+    prec = _precedence.get(node.op, 0)
+    _operand(node.left, prec, True, parts)
+    parts.append(_spaced_ops.get(node.op) or f' {node.op} ')
+    _operand(node.right, prec, True, parts)
+
+
+def _src_UnaryOp(node, parts):
+    parts.append(node.op)
+    _operand(node.value, _UNARY_PRECEDENCE, True, parts)
+
+
+def _src_ExprStatement(node, parts):
+    parts.append(node.value)
+    parts.append(';')
+
+
+def _src_PrintStatement(node, parts):
+    parts.append('print ')
+    parts.append(node.value)
+    parts.append(';')
+
+
+def _src_Grouped(node, parts):
+    parts.append('(')
+    parts.append(node.value)
+    parts.append(')')
+
+
+def _src_ConstDeclaration(node, parts):
+    parts.append(f'const {node.name}')
+    if node.type:
+        parts.append(' ')
+        parts.append(node.type)
+    parts.append(' = ')
+    parts.append(node.initializer)
+    parts.append(';')
+
+
+def _src_VarDeclaration(node, parts):
+    parts.append(f'var {node.name}')
+    if node.type:
+        parts.append(' ')
+        parts.append(node.type)
+    if node.initializer:
+        parts.append(' = ')
+        parts.append(node.initializer)
+    parts.append(';')
+
+
+def _src_Assignment(node, parts):
+    parts.append(node.location)
+    parts.append(' = ')
+    parts.append(node.value)
+
+
+def _src_IfStatement(node, parts):
+    parts.append('if ')
+    parts.append(node.test)
+    parts.append(' {\n')
+    parts.append(node.consequence)
+    parts.append('\n}')
+    if node.alternative:
+        parts.append(' else {\n')
+        parts.append(node.alternative)
+        parts.append('\n}')
+
+
+def _src_WhileStatement(node, parts):
+    parts.append('while ')
+    parts.append(node.test)
+    parts.append(' {\n')
+    parts.append(node.body)
+    parts.append('\n}')
+
+
+def _src_BreakStatement(node, parts):
+    parts.append('break;')
+
+
+def _src_ContinueStatement(node, parts):
+    parts.append('continue;')
+
+
+# The nodes with sep between each pair, like sep.join() on their source
+def _joined(sep, nodes, parts):
+    for i, n in enumerate(nodes):
+        if i:
+            parts.append(sep)
+        parts.append(n)
+
+
+def _src_Block(node, parts):
+    _joined('\n', node.statements, parts)
+
+
+def _src_Compound(node, parts):
+    parts.append('{ ')
+    _joined(' ', node.statements, parts)
+    parts.append('}')
+
+
+def _src_FnDeclaration(node, parts):
+    parts.append(f'func {node.name} (')
+    _joined(', ', node.fn_parameters, parts)
+    parts.append(') ')
+    parts.append(node.fn_return_type)
+    parts.append(' {\n')
+    parts.append(node.fn_code_block)
+    parts.append('\n}\n')
+
+
+def _src_FnParameters(node, parts):
+    _joined(',', node.parameters_list, parts)
+
+
+def _src_FnParameter(node, parts):
+    if node.param_declaration.type:
+        parts.append(node.param_declaration.name.value)
+        parts.append(' ')
+        parts.append(node.param_declaration.type)
+
+
+def _src_FnReturn(node, parts):
+    parts.append('return ')
+    parts.append(node.expression)
+    parts.append(' ;')
+
+
+_HANDLERS = {
+    Integer: _src_Integer,
+    Float: _src_Float,
+    Boolean: _src_Boolean,
+    Name: _src_Name,
+    Type: _src_Type,
+    BinOp: _src_BinOp,
+    RelOp: _src_RelOp,
+    UnaryOp: _src_UnaryOp,
+    ExprStatement: _src_ExprStatement,
+    PrintStatement: _src_PrintStatement,
+    Grouped: _src_Grouped,
+    ConstDeclaration: _src_ConstDeclaration,
+    VarDeclaration: _src_VarDeclaration,
+    Assignment: _src_Assignment,
+    IfStatement: _src_IfStatement,
+    WhileStatement: _src_WhileStatement,
+    BreakStatement: _src_BreakStatement,
+    ContinueStatement: _src_ContinueStatement,
+    Block: _src_Block,
+    Compound: _src_Compound,
+    FnDeclaration: _src_FnDeclaration,
+    FnParameters: _src_FnParameters,
+    FnParameter: _src_FnParameter,
+    FnReturn: _src_FnReturn,
+}
+
+
+def to_source(node):
+    out = []
+    parts = []
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if type(item) is str:
+            out.append(item)
+            continue
+        try:
+            handler = _HANDLERS[type(item)]
+        except KeyError:
+            raise RuntimeError(f"Can't convert {item} to source") from None
+        handler(item, parts)
+        # pushed last-first so the pieces come back off the stack in order
+        stack.extend(reversed(parts))
+        parts.clear()
+    return ''.join(out)
+
+
+# A flattened copy of a model, for passes that want to run over plain
+# arrays (and be compiled with Numba) rather than over node objects.
+# Node i is stored across parallel arrays ("structure of arrays"):
+#
+#     kind[i]       index of its class in NODE_CLASSES
+#     left[i]       its first child, or -1
+#     right[i]      its next sibling, or -1
+#     value_idx[i]  index into values of its op/name/literal, or -1
+#
+# Nodes are numbered in source order, so the root is node 0.
+
+NODE_CLASSES = (
+    Integer, Float, Boolean, Name, Type, BinOp, RelOp, UnaryOp, Grouped,
+    Assignment, Compound, ExprStatement, PrintStatement, IfStatement,
+    WhileStatement, ConstDeclaration, VarDeclaration, BreakStatement,
+    ContinueStatement, Block, FnDeclaration, FnParameters, FnParameter,
+    FnReturn, FnCall, FnArguments,
+)
+
+NODE_KINDS = {cls: kind for kind, cls in enumerate(NODE_CLASSES)}
+
+
+# The children of a node, in order.  Missing optional parts are skipped.
+def _flat_children(node):
+    cls = type(node)
+    if cls in (BinOp, RelOp):
+        return [node.left, node.right]
+    elif cls in (UnaryOp, Grouped, ExprStatement, PrintStatement):
+        return [node.value]
+    elif cls is Assignment:
+        return [node.location, node.value]
+    elif cls in (Compound, Block):
+        return node.statements
+    elif cls is IfStatement:
+        return [node.test, node.consequence] + ([node.alternative] if node.alternative else [])
+    elif cls is WhileStatement:
+        return [node.test, node.body]
+    elif cls in (ConstDeclaration, VarDeclaration):
+        return [part for part in (node.type, node.initializer) if part]
+    elif cls is FnDeclaration:
+        return node.fn_parameters + [node.fn_return_type, node.fn_code_block]
+    elif cls is FnParameters:
+        return node.parameters_list
+    elif cls is FnParameter:
+        return [node.param_declaration]
+    elif cls in (FnReturn, FnCall):
+        return [node.expression]
+    return []
+
+
+# The op, name or literal a node carries, if any
+def _flat_value(node):
+    cls = type(node)
+    if cls in (Integer, Float, Boolean, Name):
+        return node.value
+    elif cls is Type:
+        return node.name
+    elif cls in (BinOp, RelOp, UnaryOp):
+        return node.op
+    elif cls in (ConstDeclaration, VarDeclaration, FnDeclaration, FnCall):
+        return node.name
+    return None
+
+
+class FlatAST:
+    __slots__ = ('kind', 'left', 'right', 'value_idx', 'values', 'depth', 'classes')
+
+    def __init__(self, kind, left, right, value_idx, values, depth):
+        self.classes = NODE_CLASSES   # What each kind number stands for
+        self.kind = kind
+        self.left = left
+        self.right = right
+        self.value_idx = value_idx
+        self.values = values
+        self.depth = depth      # Most nodes on any path down from the root
+
+    def __len__(self):
+        return len(self.kind)
+
+    def post_order(self):
+        '''
+        The node numbers with every node after all of its children, the
+        order a bottom-up pass visits them in.
+        '''
+        if np is not None:
+            stack = np.empty(self.depth, np.int32)
+            order = np.empty(len(self), np.int32)
+        else:
+            stack = [0] * self.depth
+            order = [0] * len(self)
+        _post_order(self.left, self.right, stack, order)
+        return order
+
+
+def flatten(node):
+    kind, left, right, value_idx, values = [], [], [], [], []
+    last_child = []
+    depth = 0
+    # Children are pushed last-first so they come off the stack in
+    # order, each one after the whole subtree of the sibling before it.
+    stack = [(node, -1, 1)]
+    while stack:
+        node, parent, level = stack.pop()
+        try:
+            node_kind = NODE_KINDS[type(node)]
+        except KeyError:
+            raise RuntimeError(f"Can't flatten {node}") from None
+        index = len(kind)
+        kind.append(node_kind)
+        left.append(-1)
+        right.append(-1)
+        last_child.append(-1)
+        value = _flat_value(node)
+        if value is None:
+            value_idx.append(-1)
+        else:
+            value_idx.append(len(values))
+            values.append(value)
+        if parent >= 0:
+            if last_child[parent] < 0:
+                left[parent] = index
+            else:
+                right[last_child[parent]] = index
+            last_child[parent] = index
+        depth = max(depth, level)
+        for child in reversed(_flat_children(node)):
+            stack.append((child, index, level + 1))
+    if np is not None:
+        kind = np.array(kind, np.int8)
+        left = np.array(left, np.int32)
+        right = np.array(right, np.int32)
+        value_idx = np.array(value_idx, np.int32)
+    return FlatAST(kind, left, right, value_idx, values, depth)
+
+
+# Fills order with the node numbers in post-order, using stack (sized
+# to the depth of the tree) in place of recursion.
+def _post_order(left, right, stack, order):
+    count = 0
+    sp = 0
+    node = 0
+    while True:
+        while left[node] >= 0:
+            stack[sp] = node
+            sp += 1
+            node = left[node]
+        order[count] = node
+        count += 1
+        while right[node] < 0:
+            if sp == 0:
+                return count
+            sp -= 1
+            node = stack[sp]
+            order[count] = node
+            count += 1
+        node = right[node]
+
+
+if njit is not None:
+    _post_order = njit(cache=True)(_post_order)
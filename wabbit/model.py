@@ -48,6 +48,9 @@
 # use basic data structures. You can add usability enhancements later.
 # -----------------------------------------------------------------------------
 
+import ast
+import sys
+
 NoneType = type(None)
 
 
@@ -56,24 +59,39 @@ NoneType = type(None)
 # if you want to go in a different direction with it.
 
 class Node:
-    def __init__(self):
-        self.id = ...  # Primary-key (unique)
+    __slots__ = ()
+
+    # The attributes holding the node's children, in source order
+    _CHILD_ATTRS = ()
+
+    def children(self):
+        '''
+        The child nodes, in source order.  A list-valued attribute
+        (like the statements of a Block) gives each of its items and a
+        missing optional part (None) is skipped.
+        '''
+        for attr in self._CHILD_ATTRS:
+            child = getattr(self, attr)
+            if type(child) is list:
+                yield from child
+            elif child is not None:
+                yield child
 
 
 # Expressions represent values.   Eg. BinOp
 class Expression(Node):
-    pass
+    __slots__ = ()
 
 
 # Statement represents an "action". Not a value. Eg. print.
 class Statement(Node):
-    pass
+    __slots__ = ()
 
 
 # A declaration is a special kind of statement that additionally declares
 # the existence of a name.
 class Declaration(Statement):
-    pass
+    __slots__ = ()
 
 
 # --- Expressions
@@ -83,10 +101,13 @@ class Integer(Expression):
     Example: 42
     '''
 
+    __slots__ = ('value', '_v')
+
     def __init__(self, value):
-        super().__init__()
         assert isinstance(value, str), value
         self.value = value
+        # The number itself, converted once
+        self._v = int(value)
 
     def __repr__(self):
         return f'Integer({self.value})'
@@ -97,10 +118,13 @@ class Float(Expression):
     Example: 4.2
     '''
 
+    __slots__ = ('value', '_v')
+
     def __init__(self, value):
-        super().__init__()
         assert isinstance(value, str), value
         self.value = value
+        # The number itself, converted once
+        self._v = float(value)
 
     def __repr__(self):
         return f'Float({self.value})'
@@ -110,9 +134,13 @@ class Char(Expression):
     '''
     Example: 'x'
     '''
+    __slots__ = ('value', '_ch')
+
     def __init__(self, value):
         assert isinstance(value, str), value
         self.value = value
+        # The character itself, with any escape already decoded
+        self._ch = ast.literal_eval(value)
 
     def __repr__(self):
         return f'Char({self.value})'
@@ -123,11 +151,13 @@ class Boolean(Expression):
     Example: true, false
     '''
 
+    __slots__ = ('value', '_v')
+
     def __init__(self, value):
-        super().__init__()
         assert value in {'true', 'false'}, value
 
         self.value = value
+        self._v = value == 'true'
 
     def __repr__(self):
         return f'Boolean({self.value})'
@@ -138,65 +168,62 @@ class Name(Expression):
     Example: x
     '''
 
+    __slots__ = ('value', '_cached_stamp', '_cached_slot')
+
     def __init__(self, value):
-        super().__init__()
         assert isinstance(value, str), value
-        self.value = value
+        self.value = sys.intern(value)
+        # The interpreter remembers where it last found this name
+        self._cached_stamp = None
+        self._cached_slot = None
 
     def __repr__(self):
         return f'Name({self.value})'
 
 
-class BinOp(Expression):
-    '''
-    Example: left + right
-    '''
+# BinOp, RelOp and LogicalOp hold the same three parts and only differ
+# in which operators they take, so they share one implementation.  They
+# stay separate classes because the passes over the model treat
+# arithmetic, comparisons and && / || differently.
+class _BinaryOperator(Expression):
+    __slots__ = ('op', 'left', 'right', '_constant')
+    _CHILD_ATTRS = ('left', 'right')
 
     def __init__(self, op, left: Expression, right: Expression):
-        super().__init__()
         assert isinstance(left, Expression), left
         assert isinstance(right, Expression), right
-        self.op = op
+        self.op = sys.intern(op)
         self.left = left
         self.right = right
+        # The interpreter stores the value here if it never changes
+        self._constant = None
 
     def __repr__(self):
-        return f'BinOp({self.op}, {self.left}, {self.right})'
+        return f'{type(self).__name__}({self.op}, {self.left}, {self.right})'
 
 
-class RelOp(Expression):
+class BinOp(_BinaryOperator):
     '''
-    Example: left < right
+    Example: left + right
     '''
 
-    def __init__(self, op, left: Expression, right: Expression):
-        super().__init__()
-        assert isinstance(left, Expression), left
-        assert isinstance(right, Expression), right
-        self.op = op
-        self.left = left
-        self.right = right
+    __slots__ = ()
 
-    def __repr__(self):
-        return f'RelOp({self.op}, {self.left}, {self.right})'
 
-
-class LogicalOp(Expression):
+class RelOp(_BinaryOperator):
     '''
     Example: left < right
     '''
 
-    def __init__(self, op, left: Expression, right: Expression):
-        super().__init__()
-        assert isinstance(left, Expression), left
-        assert isinstance(right, Expression), right
-        self.op = op
-        self.left = left
-        self.right = right
+    __slots__ = ()
 
-    def __repr__(self):
-        return f'LogicalOp({self.op}, {self.left}, {self.right})'
 
+class LogicalOp(_BinaryOperator):
+    '''
+    Example: left && right
+    '''
+
+    __slots__ = ()
 
 
 class UnaryOp(Expression):
@@ -204,11 +231,23 @@ class UnaryOp(Expression):
     Example: -value
     '''
 
+    __slots__ = ('op', 'value', '_constant')
+    _CHILD_ATTRS = ('value',)
+
+    # A minus sign applied directly to a number literal is folded into
+    # the literal itself, so -4 is just Integer('-4').
+    def __new__(cls, op, value):
+        if op == '-' and type(value) in (Integer, Float):
+            text = value.value
+            return type(value)(text[1:] if text.startswith('-') else '-' + text)
+        return super().__new__(cls)
+
     def __init__(self, op, value):
-        super().__init__()
         assert isinstance(value, Expression), value
-        self.op = op
+        self.op = sys.intern(op)
         self.value = value
+        # The interpreter stores the value here if it never changes
+        self._constant = None
 
     def __repr__(self):
         return f'UnaryOp({self.op}, {self.value})'
@@ -219,10 +258,14 @@ class Grouped(Expression):
     Example: ( value )
     '''
 
+    __slots__ = ('value', '_constant')
+    _CHILD_ATTRS = ('value',)
+
     def __init__(self, value):
-        super().__init__()
         assert isinstance(value, Expression), value
         self.value = value
+        # The interpreter stores the value here if it never changes
+        self._constant = None
 
     def __repr__(self):
         return f'Grouped({self.value})'
@@ -233,8 +276,10 @@ class Assignment(Expression):
     Example: x = 2 + 3
     '''
 
+    __slots__ = ('location', 'value')
+    _CHILD_ATTRS = ('location', 'value')
+
     def __init__(self, location, value):
-        super().__init__()
         assert isinstance(location, Expression), location
         assert isinstance(value, Expression), value
         self.location = location
@@ -251,8 +296,10 @@ class Compound(Expression):
     x = { stmt1; stmt2; ...; expr }
     '''
 
+    __slots__ = ('statements',)
+    _CHILD_ATTRS = ('statements',)
+
     def __init__(self, statements):
-        super().__init__()
         assert isinstance(statements, list) and len(statements) > 0, statements
         self.statements = statements
 
@@ -271,8 +318,10 @@ class ExprStatement(Statement):
     x;
     '''
 
+    __slots__ = ('value',)
+    _CHILD_ATTRS = ('value',)
+
     def __init__(self, value):
-        super().__init__()
         assert isinstance(value, Expression), value
         self.value = value
 
@@ -285,8 +334,10 @@ class PrintStatement(Statement):
     Example: print value;
     '''
 
+    __slots__ = ('value',)
+    _CHILD_ATTRS = ('value',)
+
     def __init__(self, value):
-        super().__init__()
         assert isinstance(value, Expression), value
         self.value = value
 
@@ -300,8 +351,10 @@ class IfStatement(Statement):
     if test { consequence } else { alternative }
     '''
 
+    __slots__ = ('test', 'consequence', 'alternative')
+    _CHILD_ATTRS = ('test', 'consequence', 'alternative')
+
     def __init__(self, test, consequence, alternative):
-        super().__init__()
         assert isinstance(test, Expression), test
         assert isinstance(consequence, Block), consequence
         assert isinstance(alternative, (Block, NoneType)), alternative
@@ -318,8 +371,10 @@ class WhileStatement(Statement):
     while test { statements }
     '''
 
+    __slots__ = ('test', 'body')
+    _CHILD_ATTRS = ('test', 'body')
+
     def __init__(self, test, body):
-        super().__init__()
         assert isinstance(test, Expression), test
         assert isinstance(body, Block), body
         self.test = test
@@ -339,9 +394,11 @@ class ConstDeclaration(Declaration):
     Immutable.
     '''
 
+    __slots__ = ('name', 'type', 'initializer')
+    _CHILD_ATTRS = ('type', 'initializer')
+
     def __init__(self, name, type, initializer):
-        super().__init__()
-        self.name = name
+        self.name = sys.intern(name)
         self.type = type  # Optional
         self.initializer = initializer
 
@@ -356,9 +413,11 @@ class VarDeclaration(Declaration):
     Mutable. 
     '''
 
+    __slots__ = ('name', 'type', 'initializer')
+    _CHILD_ATTRS = ('type', 'initializer')
+
     def __init__(self, name, type, initializer):
-        super().__init__()
-        self.name = name
+        self.name = sys.intern(name)
         self.type = type  # Optional
         self.initializer = initializer  # Optional
 
@@ -367,11 +426,15 @@ class VarDeclaration(Declaration):
 
 
 class BreakStatement(Statement):
+    __slots__ = ()
+
     def __repr__(self):
         return f'BreakStatement()'
 
 
 class ContinueStatement(Statement):
+    __slots__ = ()
+
     def __repr__(self):
         return f'ContinueStatement()'
 
@@ -383,8 +446,10 @@ class Block(Node):
     Zero or more statements
     '''
 
+    __slots__ = ('statements',)
+    _CHILD_ATTRS = ('statements',)
+
     def __init__(self, statements):
-        super().__init__()
         self.statements = statements
 
 
@@ -393,25 +458,29 @@ class Type(Node):
     A typename like "int", "float", etc.
     '''
 
+    __slots__ = ('name',)
+
     def __init__(self, name):
-        super().__init__()
-        self.name = name
+        self.name = sys.intern(name)
 
     def __repr__(self):
         return f'Type({self.name})'
 
 
 class FunctionDefinition(Statement):
+    __slots__ = ('name', 'fn_parameters', 'fn_return_type', 'fn_code_block')
+    _CHILD_ATTRS = ('name', 'fn_parameters', 'fn_return_type', 'fn_code_block')
 
     def __init__(self, name, fn_parameters, fn_return_type, fn_code_block):
-        super().__init__()
         assert isinstance(fn_parameters, FunctionParameters), fn_parameters
-        if fn_parameters:
+        # Checking each parameter takes a loop, which python -O would
+        # still run (empty) if it weren't under __debug__ like the asserts
+        if __debug__:
             assert isinstance(fn_parameters.parameters_list, list), fn_parameters.parameters_list
             for parameter in fn_parameters.parameters_list:
                 assert isinstance(parameter, FunctionParameter), parameter
         assert isinstance(fn_return_type, Type), fn_return_type
-        assert isinstance(fn_code_block, Block) and fn_code_block is not None, fn_code_block
+        assert isinstance(fn_code_block, Block), fn_code_block
         self.name = name
         self.fn_parameters = fn_parameters
         self.fn_return_type = fn_return_type
@@ -421,23 +490,26 @@ class FunctionDefinition(Statement):
         return f'FunctionDefinition({self.name} ({self.fn_parameters}) {self.fn_return_type} => {self.fn_code_block.statements})'
 
 
-class FunctionParameters:
+class FunctionParameters(Node):
+    __slots__ = ('parameters_list',)
+    _CHILD_ATTRS = ('parameters_list',)
 
     def __init__(self, parameters_list):
         assert isinstance(parameters_list, list), parameters_list
         self.parameters_list = parameters_list
 
     def __repr__(self):
-        return ','.join([str(parameter) for parameter in self.parameters_list])
+        return ','.join(map(str, self.parameters_list))
 
 
 class FunctionParameter(Declaration):
+    __slots__ = ('name', 'type', 'initializer')
+    _CHILD_ATTRS = ('type', 'initializer')
 
     def __init__(self, name, type, initializer):
-        super().__init__()
         assert name is not None, name
-        assert isinstance(type, Type) and type is not None, type
-        self.name = name
+        assert isinstance(type, Type), type
+        self.name = sys.intern(name)
         self.type = type
         self.initializer = initializer # Optional
 
@@ -446,9 +518,10 @@ class FunctionParameter(Declaration):
 
 
 class FunctionReturn(Statement):
+    __slots__ = ('expression',)
+    _CHILD_ATTRS = ('expression',)
 
     def __init__(self, expression):
-        super().__init__()
         assert isinstance(expression, Expression), expression
         self.expression = expression
 
@@ -457,28 +530,78 @@ class FunctionReturn(Statement):
 
 
 class FunctionApplication(Expression):
+    __slots__ = ('name', 'fn_arguments', '_target')
+    _CHILD_ATTRS = ('name', 'fn_arguments')
 
     def __init__(self, name, fn_arguments):
-        super().__init__()
         assert isinstance(name, Name), name
         assert isinstance(fn_arguments, FunctionArguments), fn_arguments
         self.name = name
         self.fn_arguments = fn_arguments
+        # The interpreter binds a call to a global function here
+        self._target = None
 
     def __repr__(self):
         return f'FunctionApplication{self.name} (FunctionArguments({self.fn_arguments}))'
 
 
-class FunctionArguments:
+class FunctionArguments(Node):
+    __slots__ = ('arguments_list',)
+    _CHILD_ATTRS = ('arguments_list',)
 
     def __init__(self, arguments_list):
         assert isinstance(arguments_list, list), arguments_list
         self.arguments_list = arguments_list
 
     def __repr__(self):
+        return ','.join(map(str, self.arguments_list))
+
+
+# Shared leaf nodes.  Literals and type names carry nothing but their text,
+# so hand-built models can reuse one node per distinct value instead of
+# making a new one every time.  Shared nodes must be treated as read-only.
+# Names are deliberately left out: a name means different things in
+# different scopes.
+_leaves = {}
 
-        return ','.join([str(argument) for argument in self.arguments_list])
 
+def _leaf(cls, value):
+    key = (cls, value)
+    node = _leaves.get(key)
+    if node is None:
+        node = _leaves[key] = cls(value)
+    return node
+
+
+def make_integer(value):
+    return _leaf(Integer, value)
+
+
+def make_float(value):
+    return _leaf(Float, value)
+
+
+def make_boolean(value):
+    return _leaf(Boolean, value)
+
+
+def make_type(name):
+    return _leaf(Type, name)
+
+
+def walk(node):
+    '''
+    Every node in the tree under node (node included), each one before
+    its children and in source order.  Uses a stack instead of
+    recursion, so a pass written as "for n in walk(model)" works on
+    however deeply nested a program is.
+    '''
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        # pushed last-first so the children come off the stack in order
+        stack.extend(reversed(list(node.children())))
 
 
 # Debugging function to convert a model back into source code (for easier viewing)
@@ -497,93 +620,206 @@ class FunctionArguments:
 
 # How would you modify to auto-indent the output?
 # Automatically format the code nicely (like gofmt, black, etc.)
-def to_source(node):
 
-    if isinstance(node, Integer):
-        return str(node.value)
+# Each binary operator as written between its operands
+_spaced_ops = {op: f' {op} ' for op in ('+', '-', '*', '/',
+                                       '<', '<=', '>', '>=', '==', '!=',
+                                       '&&', '||')}
 
-    elif isinstance(node, Float):
-        return str(node.value)
 
-    elif isinstance(node, Boolean):
-        return str(node.value)
+# The handlers below append the pieces of a node's source to parts, in
+# order: strings to output as they are and child nodes to be converted
+# in their place (see to_source()).
+def _src_literal(node, parts):
+    parts.append(str(node.value))
 
-    elif isinstance(node, Name):
-        return node.value
 
-    elif isinstance(node, Type):
-        return node.name
+def _src_Name(node, parts):
+    parts.append(node.value)
 
-    elif isinstance(node, BinOp):
-        return f'{to_source(node.left)} {node.op} {to_source(node.right)}'
 
-    elif isinstance(node, RelOp):
-        return f'{to_source(node.left)} {node.op} {to_source(node.right)}'
+def _src_Type(node, parts):
+    parts.append(node.name)
 
-    elif isinstance(node, LogicalOp):
-        return f'{to_source()}'
-    elif isinstance(node, UnaryOp):
-        return f'{node.op}{to_source(node.value)}'
 
-    elif isinstance(node, ExprStatement):
-        return f'{to_source(node.value)};'
+def _src_operator(node, parts):
+    parts.append(node.left)
+    parts.append(_spaced_ops.get(node.op) or f' {node.op} ')
+    parts.append(node.right)
 
-    elif isinstance(node, PrintStatement):
-        return f'print {to_source(node.value)};'
 
-    elif isinstance(node, Grouped):
-        return f'({to_source(node.value)})'
+def _src_UnaryOp(node, parts):
+    parts.append(node.op)
+    parts.append(node.value)
 
-    elif isinstance(node, ConstDeclaration):
-        if node.type:
-            return f'const {node.name} {to_source(node.type)} = {to_source(node.initializer)};'
-        else:
-            return f'const {node.name} = {to_source(node.initializer)};'
 
-    elif isinstance(node, VarDeclaration):
-        if node.type:
-            code = f'var {node.name} {to_source(node.type)}'
-        else:
-            code = f'var {node.name}'
+def _src_ExprStatement(node, parts):
+    parts.append(node.value)
+    parts.append(';')
 
-        if node.initializer:
-            code += f' = {to_source(node.initializer)}'
-        return code + ';'
 
-    elif isinstance(node, Assignment):
-        return f'{to_source(node.location)} = {to_source(node.value)}'
+def _src_PrintStatement(node, parts):
+    parts.append('print ')
+    parts.append(node.value)
+    parts.append(';')
 
-    elif isinstance(node, IfStatement):
-        code = f'if {to_source(node.test)} ' + '{\n'
-        code += to_source(node.consequence) + '\n}'
-        if node.alternative:
-            code += ' else {\n'
-            code += to_source(node.alternative)
-            code += '\n}'
-        return code
 
-    elif isinstance(node, WhileStatement):
-        code = f'while {to_source(node.test)} ' + '{\n'
-        code += to_source(node.body) + '\n}'
-        return code
+def _src_Grouped(node, parts):
+    parts.append('(')
+    parts.append(node.value)
+    parts.append(')')
 
-    elif isinstance(node, BreakStatement):
-        return 'break;'
 
-    elif isinstance(node, ContinueStatement):
-        return 'continue;'
+def _src_ConstDeclaration(node, parts):
+    parts.append('const ')
+    parts.append(node.name)
+    if node.type:
+        parts.append(' ')
+        parts.append(node.type)
+    parts.append(' = ')
+    parts.append(node.initializer)
+    parts.append(';')
+
+
+def _src_VarDeclaration(node, parts):
+    parts.append('var ')
+    parts.append(node.name)
+    if node.type:
+        parts.append(' ')
+        parts.append(node.type)
+    if node.initializer:
+        parts.append(' = ')
+        parts.append(node.initializer)
+    parts.append(';')
+
+
+def _src_Assignment(node, parts):
+    parts.append(node.location)
+    parts.append(' = ')
+    parts.append(node.value)
+
+
+def _src_IfStatement(node, parts):
+    parts.append('if ')
+    parts.append(node.test)
+    parts.append(' {\n')
+    parts.append(node.consequence)
+    parts.append('\n}')
+    if node.alternative:
+        parts.append(' else {\n')
+        parts.append(node.alternative)
+        parts.append('\n}')
+
+
+def _src_WhileStatement(node, parts):
+    parts.append('while ')
+    parts.append(node.test)
+    parts.append(' {\n')
+    parts.append(node.body)
+    parts.append('\n}')
+
+
+def _src_BreakStatement(node, parts):
+    parts.append('break;')
+
+
+def _src_ContinueStatement(node, parts):
+    parts.append('continue;')
+
+
+# The statements go straight into parts with a separator between each
+# pair, rather than being converted into a list of strings to join.
+def _src_Block(node, parts):
+    for n, statement in enumerate(node.statements):
+        if n:
+            parts.append('\n')
+        parts.append(statement)
+
+
+def _src_Compound(node, parts):
+    parts.append('{ ')
+    for n, statement in enumerate(node.statements):
+        if n:
+            parts.append(' ')
+        parts.append(statement)
+    parts.append('}')
+
+
+# Each node class and the function that converts it, so that finding the
+# right code for a node is one dictionary lookup on its type rather than
+# a long run of isinstance() tests.
+_SOURCE_HANDLERS = {
+    Integer: _src_literal,
+    Float: _src_literal,
+    Boolean: _src_literal,
+    Char: _src_literal,
+    Name: _src_Name,
+    Type: _src_Type,
+    BinOp: _src_operator,
+    RelOp: _src_operator,
+    LogicalOp: _src_operator,
+    UnaryOp: _src_UnaryOp,
+    ExprStatement: _src_ExprStatement,
+    PrintStatement: _src_PrintStatement,
+    Grouped: _src_Grouped,
+    ConstDeclaration: _src_ConstDeclaration,
+    VarDeclaration: _src_VarDeclaration,
+    Assignment: _src_Assignment,
+    IfStatement: _src_IfStatement,
+    WhileStatement: _src_WhileStatement,
+    BreakStatement: _src_BreakStatement,
+    ContinueStatement: _src_ContinueStatement,
+    Block: _src_Block,
+    Compound: _src_Compound,
+}
+
+# The handler for a class that isn't in the table itself (a subclass of
+# one that is), found through its bases and then added to the table so
+# the next lookup is direct.  None if there isn't one.
+def _find_handler(handlers, cls):
+    for base in cls.__mro__[1:]:
+        handler = handlers.get(base)
+        if handler is not None:
+            handlers[cls] = handler
+            return handler
+    return None
 
-    elif isinstance(node, Block):
-        return '\n'.join([to_source(n) for n in node.statements])
 
-    elif isinstance(node, Compound):
-        return '{ ' + ' '.join([to_source(n) for n in node.statements]) + '}'
-
-    else:
-        raise RuntimeError(f"Can't convert {node} to source")
+def to_source(node):
+    '''
+    Source for node, on a single line per statement.  Works from a
+    stack the same way as to_source_pp() below.
+    '''
+    out = []
+    parts = []
+    stack = [node]
+    write = out.append
+    pop = stack.pop
+    push_all = stack.extend
+    handlers = _SOURCE_HANDLERS
+    while stack:
+        item = pop()
+        if item.__class__ is str:
+            write(item)
+            continue
+        handler = handlers.get(item.__class__) or _find_handler(handlers, type(item))
+        if handler is None:
+            raise RuntimeError(f"Can't convert {item} to source")
+        handler(item, parts)
+        # pushed last-first so the pieces come back off the stack in order
+        parts.reverse()
+        push_all(parts)
+        parts.clear()
+    return ''.join(out)
+
+
+# The indentation for each level, added to as deeper levels are asked
+# for.  Every statement printed at a level shares the one string.
+_indents = ['']
 
 
 class DisplayContext:
+    __slots__ = ('level',)
     ws = '  '
 
     def __init__(self, parent=None):
@@ -592,125 +828,264 @@ class DisplayContext:
             self.level = parent.level + 1
 
     def gen_ws(self):
-        return self.ws * self.level
+        level = self.level
+        while len(_indents) <= level:
+            _indents.append(_indents[-1] + self.ws)
+        return _indents[level]
 
 
 def to_source_pp(node, disp):
-
+    '''
+    Pretty-printed source for node.  Works from a stack instead of
+    recursing, so deeply nested programs can't overflow the Python
+    stack.  Each node's handler appends the pieces of its source to
+    parts, in order: strings to output as they are and (node, disp)
+    pairs to be converted in their place.  The output is collected in
+    one list and joined once at the end.
+    '''
     if disp is None:
         disp = DisplayContext(parent=None)
-
-    if isinstance(node, Integer):
-        return str(node.value)
-
-    elif isinstance(node, Float):
-        return str(node.value)
-
-    elif isinstance(node, Boolean):
-        return str(node.value)
-
-    elif isinstance(node, Char):
-        return str(node.value)
-
-    elif isinstance(node, Name):
-        return node.value
-
-    elif isinstance(node, Type):
-        return node.name
-
-    elif isinstance(node, BinOp):
-        return f'{to_source_pp(node.left,disp)} {node.op} {to_source_pp(node.right, disp)}'
-
-    elif isinstance(node, RelOp):
-        return f'{to_source_pp(node.left, disp)} {node.op} {to_source_pp(node.right, disp)}'
-
-    elif isinstance(node, LogicalOp):
-        return f'{to_source_pp(node.left,disp)} {node.op} {to_source_pp(node.right,disp)}'
-
-    elif isinstance(node, UnaryOp):
-        return f'{node.op}{to_source_pp(node.value, disp)}'
-
-    elif isinstance(node, ExprStatement):
-        return f'{disp.gen_ws()}{to_source_pp(node.value, disp)};'
-
-    elif isinstance(node, PrintStatement):
-        return f'{disp.gen_ws()}print {to_source_pp(node.value,disp)};'
-
-    elif isinstance(node, Grouped):
-        return f'({to_source_pp(node.value, disp)})'
-
-    elif isinstance(node, ConstDeclaration):
-        if node.type:
-            return f'{disp.gen_ws()}const {node.name} {to_source_pp(node.type,disp)} = {to_source_pp(node.initializer, disp)};'
-        else:
-            return f'{disp.gen_ws()}const {node.name} = {to_source_pp(node.initializer, disp)};'
-
-    elif isinstance(node, VarDeclaration):
-        if node.type:
-            code = f'{disp.gen_ws()}var {node.name} {to_source_pp(node.type, disp)}'
-        else:
-            code = f'{disp.gen_ws()}var {node.name}'
-
-        if node.initializer:
-            code += f' = {to_source_pp(node.initializer, disp)}'
-        return code + ';'
-
-    elif isinstance(node, Assignment):
-        return f'{disp.gen_ws()}{to_source_pp(node.location,disp)} = {to_source_pp(node.value,disp)};'
-
-    elif isinstance(node, IfStatement):
-        code = f'{disp.gen_ws()}if {to_source_pp(node.test,disp)} ' + '{\n'
-        child_disp=DisplayContext(parent=disp)
-        code += child_disp.gen_ws() + to_source_pp(node.consequence,child_disp) + '\n'+ child_disp.gen_ws()+'}'
-        if node.alternative:
-            code += ' else {\n'
-            code += child_disp.gen_ws() + to_source_pp(node.alternative,child_disp)
-            code += disp.gen_ws() + '\n' + child_disp.gen_ws() + '}'
-        return code
-
-    elif isinstance(node, WhileStatement):
-        code = f'{disp.gen_ws()}while {to_source_pp(node.test, disp)} ' + '{\n'
-        child_disp=DisplayContext(parent=disp)
-        code += to_source_pp(node.body, child_disp) + '\n'+ child_disp.gen_ws()+'}'
-        return code
-
-    elif isinstance(node, BreakStatement):
-        return f'{disp.gen_ws()}break;'
-
-    elif isinstance(node, ContinueStatement):
-        return f'{disp.gen_ws()}continue;'
-
-    elif isinstance(node, Block):
-        return '\n'.join([disp.gen_ws() + to_source_pp(n,disp) for n in node.statements])
-
-    elif isinstance(node, Compound):
-        return disp.gen_ws() + '{ ' + ' '.join([to_source_pp(n, disp) for n in node.statements]) + '}'
-
-    elif isinstance(node, FunctionDefinition):
-        code = f'func {to_source_pp(node.name,disp)} '
-        code += '(' + ', '.join([to_source_pp(n, disp) for n in node.fn_parameters.parameters_list]) + ') '
-        code += to_source_pp(node.fn_return_type, disp)
-        code += ' {\n' + to_source_pp(node.fn_code_block, DisplayContext(parent=disp)) + '\n'+disp.gen_ws()+'}\n'
-        return code
-
-    elif isinstance(node, FunctionParameters):
-        return ','.join([to_source_pp(n, disp) for n in node.parameters_list])
-
-    elif isinstance(node, FunctionParameter):
-
-        if node.initializer:
-            return f'{node.name} {to_source_pp(node.type, disp)} = {node.initializer}'
-        else:
-            return f'{node.name} {to_source_pp(node.type, disp)}'
-
-    elif isinstance(node, FunctionReturn):
-        return 'return ' + to_source_pp(node.expression, disp) + ';'
-
-    elif isinstance(node, FunctionApplication):
-        return node.name.value + '(' + \
-               ', '.join([to_source_pp(argument, disp) for argument in node.fn_arguments.arguments_list]) +\
-               ')'
-
-    else:
-        print(f"TODO - No pretty print handler - unable to convert {node} to source code")
-        # raise RuntimeError(f"No pretty print handler - unable to convert {node} to source code")
+    out = []
+    parts = []
+    stack = [(node, disp)]
+    # Looked up once here rather than on every trip around the loop
+    write = out.append
+    pop = stack.pop
+    push_all = stack.extend
+    handlers = _PP_HANDLERS
+    while stack:
+        item = pop()
+        if item.__class__ is str:
+            write(item)
+            continue
+        node, disp = item
+        handler = handlers.get(node.__class__) or _find_handler(handlers, type(node))
+        if handler is None:
+            print(f"TODO - No pretty print handler - unable to convert {node} to source code")
+            # raise RuntimeError(f"No pretty print handler - unable to convert {node} to source code")
+            write('None')
+            continue
+        handler(node, disp, parts)
+        # pushed last-first so the pieces come back off the stack in order
+        parts.reverse()
+        push_all(parts)
+        parts.clear()
+    return ''.join(out)
+
+
+def _pp_literal(node, disp, parts):
+    parts.append(str(node.value))
+
+
+def _pp_Name(node, disp, parts):
+    parts.append(node.value)
+
+
+def _pp_Type(node, disp, parts):
+    parts.append(node.name)
+
+
+def _pp_operator(node, disp, parts):
+    parts.append((node.left, disp))
+    parts.append(_spaced_ops.get(node.op) or f' {node.op} ')
+    parts.append((node.right, disp))
+
+
+def _pp_UnaryOp(node, disp, parts):
+    parts.append(node.op)
+    parts.append((node.value, disp))
+
+
+def _pp_ExprStatement(node, disp, parts):
+    parts.append(disp.gen_ws())
+    parts.append((node.value, disp))
+    parts.append(';')
+
+
+def _pp_PrintStatement(node, disp, parts):
+    parts.append(disp.gen_ws())
+    parts.append('print ')
+    parts.append((node.value, disp))
+    parts.append(';')
+
+
+def _pp_Grouped(node, disp, parts):
+    parts.append('(')
+    parts.append((node.value, disp))
+    parts.append(')')
+
+
+def _pp_ConstDeclaration(node, disp, parts):
+    parts.append(disp.gen_ws())
+    parts.append('const ')
+    parts.append(node.name)
+    parts.append(' ')
+    if node.type:
+        parts.append((node.type, disp))
+        parts.append(' ')
+    parts.append('= ')
+    parts.append((node.initializer, disp))
+    parts.append(';')
+
+
+def _pp_VarDeclaration(node, disp, parts):
+    parts.append(disp.gen_ws())
+    parts.append('var ')
+    parts.append(node.name)
+    if node.type:
+        parts.append(' ')
+        parts.append((node.type, disp))
+    if node.initializer:
+        parts.append(' = ')
+        parts.append((node.initializer, disp))
+    parts.append(';')
+
+
+def _pp_Assignment(node, disp, parts):
+    parts.append(disp.gen_ws())
+    parts.append((node.location, disp))
+    parts.append(' = ')
+    parts.append((node.value, disp))
+    parts.append(';')
+
+
+def _pp_IfStatement(node, disp, parts):
+    parts.append(disp.gen_ws())
+    parts.append('if ')
+    parts.append((node.test, disp))
+    parts.append(' {\n')
+    child_disp = DisplayContext(parent=disp)
+    parts.append(child_disp.gen_ws())
+    parts.append((node.consequence, child_disp))
+    parts.append('\n')
+    parts.append(child_disp.gen_ws())
+    parts.append('}')
+    if node.alternative:
+        parts.append(' else {\n')
+        parts.append(child_disp.gen_ws())
+        parts.append((node.alternative, child_disp))
+        parts.append(disp.gen_ws())
+        parts.append('\n')
+        parts.append(child_disp.gen_ws())
+        parts.append('}')
+
+
+def _pp_WhileStatement(node, disp, parts):
+    parts.append(disp.gen_ws())
+    parts.append('while ')
+    parts.append((node.test, disp))
+    parts.append(' {\n')
+    child_disp = DisplayContext(parent=disp)
+    parts.append((node.body, child_disp))
+    parts.append('\n')
+    parts.append(child_disp.gen_ws())
+    parts.append('}')
+
+
+def _pp_BreakStatement(node, disp, parts):
+    parts.append(disp.gen_ws())
+    parts.append('break;')
+
+
+def _pp_ContinueStatement(node, disp, parts):
+    parts.append(disp.gen_ws())
+    parts.append('continue;')
+
+
+def _pp_Block(node, disp, parts):
+    ws = disp.gen_ws()
+    for n, statement in enumerate(node.statements):
+        if n:
+            parts.append('\n')
+        parts.append(ws)
+        parts.append((statement, disp))
+
+
+def _pp_Compound(node, disp, parts):
+    parts.append(disp.gen_ws())
+    parts.append('{ ')
+    for n, statement in enumerate(node.statements):
+        if n:
+            parts.append(' ')
+        parts.append((statement, disp))
+    parts.append('}')
+
+
+def _pp_FunctionDefinition(node, disp, parts):
+    parts.append('func ')
+    parts.append((node.name, disp))
+    parts.append(' (')
+    for n, parameter in enumerate(node.fn_parameters.parameters_list):
+        if n:
+            parts.append(', ')
+        parts.append((parameter, disp))
+    parts.append(') ')
+    parts.append((node.fn_return_type, disp))
+    parts.append(' {\n')
+    parts.append((node.fn_code_block, DisplayContext(parent=disp)))
+    parts.append('\n')
+    parts.append(disp.gen_ws())
+    parts.append('}\n')
+
+
+def _pp_FunctionParameters(node, disp, parts):
+    for n, parameter in enumerate(node.parameters_list):
+        if n:
+            parts.append(',')
+        parts.append((parameter, disp))
+
+
+def _pp_FunctionParameter(node, disp, parts):
+    parts.append(node.name)
+    parts.append(' ')
+    parts.append((node.type, disp))
+    if node.initializer:
+        parts.append(f' = {node.initializer}')
+
+
+def _pp_FunctionReturn(node, disp, parts):
+    parts.append('return ')
+    parts.append((node.expression, disp))
+    parts.append(';')
+
+
+def _pp_FunctionApplication(node, disp, parts):
+    parts.append(node.name.value)
+    parts.append('(')
+    for n, argument in enumerate(node.fn_arguments.arguments_list):
+        if n:
+            parts.append(', ')
+        parts.append((argument, disp))
+    parts.append(')')
+
+
+# The same kind of table for the pretty printer
+_PP_HANDLERS = {
+    Integer: _pp_literal,
+    Float: _pp_literal,
+    Boolean: _pp_literal,
+    Char: _pp_literal,
+    Name: _pp_Name,
+    Type: _pp_Type,
+    BinOp: _pp_operator,
+    RelOp: _pp_operator,
+    LogicalOp: _pp_operator,
+    UnaryOp: _pp_UnaryOp,
+    ExprStatement: _pp_ExprStatement,
+    PrintStatement: _pp_PrintStatement,
+    Grouped: _pp_Grouped,
+    ConstDeclaration: _pp_ConstDeclaration,
+    VarDeclaration: _pp_VarDeclaration,
+    Assignment: _pp_Assignment,
+    IfStatement: _pp_IfStatement,
+    WhileStatement: _pp_WhileStatement,
+    BreakStatement: _pp_BreakStatement,
+    ContinueStatement: _pp_ContinueStatement,
+    Block: _pp_Block,
+    Compound: _pp_Compound,
+    FunctionDefinition: _pp_FunctionDefinition,
+    FunctionParameters: _pp_FunctionParameters,
+    FunctionParameter: _pp_FunctionParameter,
+    FunctionReturn: _pp_FunctionReturn,
+    FunctionApplication: _pp_FunctionApplication,
+}
@@ -0,0 +1,327 @@
+# model_jit.py
+#
+# to_source() for a model that has been flattened into parallel arrays
+# (see flatten() and FlatAST in model.bkp.04.19.2022.py).  The output is
+# written byte by byte into one preallocated buffer by _emit(), which
+# walks the first-child/next-sibling arrays with an explicit stack.
+# That loop only touches integer arrays, so Numba can compile it.
+#
+# This is only worth it for a model that is already flat.  Flattening a
+# model takes longer than running to_source() on it directly.
+#
+# NumPy and Numba are optional.  Without them the same code runs as
+# ordinary Python over lists and a bytearray.
+
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:
+    np = njit = None
+
+# What each node class does when printed
+R_OTHER = 0         # Not printable
+R_LEAF = 1          # Its value: numbers, booleans, names, type names
+R_BINOP = 2
+R_RELOP = 3
+R_UNARY = 4
+R_GROUPED = 5
+R_ASSIGN = 6
+R_COMPOUND = 7
+R_EXPR = 8
+R_PRINT = 9
+R_IF = 10
+R_WHILE = 11
+R_CONST = 12
+R_VAR = 13
+R_BREAK = 14
+R_CONTINUE = 15
+R_BLOCK = 16
+R_TYPE = 17
+R_FNDECL = 18
+R_FNPARAMS = 19
+R_FNPARAM = 20
+R_FNRETURN = 21
+
+_roles = {
+    'Integer': R_LEAF,
+    'Float': R_LEAF,
+    'Boolean': R_LEAF,
+    'Name': R_LEAF,
+    'Type': R_TYPE,
+    'BinOp': R_BINOP,
+    'RelOp': R_RELOP,
+    'UnaryOp': R_UNARY,
+    'Grouped': R_GROUPED,
+    'Assignment': R_ASSIGN,
+    'Compound': R_COMPOUND,
+    'ExprStatement': R_EXPR,
+    'PrintStatement': R_PRINT,
+    'IfStatement': R_IF,
+    'WhileStatement': R_WHILE,
+    'ConstDeclaration': R_CONST,
+    'VarDeclaration': R_VAR,
+    'BreakStatement': R_BREAK,
+    'ContinueStatement': R_CONTINUE,
+    'Block': R_BLOCK,
+    'FnDeclaration': R_FNDECL,
+    'FnParameters': R_FNPARAMS,
+    'FnParameter': R_FNPARAM,
+    'FnReturn': R_FNRETURN,
+}
+
+# The fixed pieces of text, by number
+_FRAGMENTS = (
+    '', ' ', ' = ', ';', 'print ', '(', ')', 'const ', 'var ', 'if ',
+    ' {\n', '\n}', ' else {\n', 'while ', 'break;', 'continue;', '\n',
+    '{ ', '}', 'func ', ' (', ', ', ') ', '\n}\n', ',', 'return ', ' ;',
+)
+(F_NONE, F_SPACE, F_EQUALS, F_SEMI, F_PRINT, F_LPAREN, F_RPAREN, F_CONST,
+ F_VAR, F_IF, F_OPEN, F_CLOSE, F_ELSE, F_WHILE, F_BREAK, F_CONTINUE,
+ F_NEWLINE, F_LBRACE, F_RBRACE, F_FUNC, F_PARAMS, F_COMMA_SPACE,
+ F_END_PARAMS, F_END_FUNC, F_COMMA, F_RETURN, F_END_RETURN) = range(len(_FRAGMENTS))
+
+# How tightly each operator binds, as in to_source()
+_precedence = {
+    '*': 3, '/': 3,
+    '+': 2, '-': 2,
+    '<': 1, '<=': 1, '==': 1, '>=': 1, '>': 1, '!=': 1,
+}
+_UNARY_PRECEDENCE = 4
+
+
+# Copy pool[start:end] into out at n.  Returns the new end of the output.
+def _put(out, n, pool, start, end):
+    for j in range(start, end):
+        out[n] = pool[j]
+        n += 1
+    return n
+
+
+def _put_fragment(out, n, fragment, frag_pool, frag_start):
+    return _put(out, n, frag_pool, frag_start[fragment], frag_start[fragment + 1])
+
+
+def _put_value(out, n, node, value_idx, text_pool, text_start):
+    v = value_idx[node]
+    return _put(out, n, text_pool, text_start[v], text_start[v + 1])
+
+
+# Whether child needs parentheses as an operand of an operator binding
+# with precedence prec (see _operand() in to_source)
+def _grouped(child, prec, strict, role, node_prec):
+    r = role[child]
+    if r == R_BINOP or r == R_RELOP:
+        return node_prec[child] < prec or (strict and node_prec[child] == prec)
+    return r == R_ASSIGN
+
+
+def _emit(role, left, right, value_idx, node_prec,
+          text_pool, text_start, frag_pool, frag_start,
+          out, stack_node, stack_child, stack_pos):
+    '''
+    Write the source of node 0 into out and return its length.  The
+    stack arrays hold, for each open node, the node, the child being
+    worked on (-1 before the first one) and that child's position.
+    '''
+    n = 0
+    top = 0
+    stack_node[0] = 0
+    stack_child[0] = -1
+    stack_pos[0] = -1
+    while top >= 0:
+        node = stack_node[top]
+        r = role[node]
+        child = stack_child[top]
+        pos = stack_pos[top]
+        in_param = r == R_VAR and top > 0 and role[stack_node[top - 1]] == R_FNPARAM
+
+        if child < 0:
+            # Entering the node
+            if r == R_LEAF or r == R_TYPE or r == R_UNARY:
+                n = _put_value(out, n, node, value_idx, text_pool, text_start)
+            elif r == R_PRINT:
+                n = _put_fragment(out, n, F_PRINT, frag_pool, frag_start)
+            elif r == R_GROUPED:
+                n = _put_fragment(out, n, F_LPAREN, frag_pool, frag_start)
+            elif r == R_CONST:
+                n = _put_fragment(out, n, F_CONST, frag_pool, frag_start)
+                n = _put_value(out, n, node, value_idx, text_pool, text_start)
+            elif r == R_VAR and in_param:
+                # Just "name type", or nothing for a parameter without a
+                # type.  Its children aren't visited.
+                first = left[node]
+                if first >= 0 and role[first] == R_TYPE:
+                    n = _put_value(out, n, node, value_idx, text_pool, text_start)
+                    n = _put_fragment(out, n, F_SPACE, frag_pool, frag_start)
+                    n = _put_value(out, n, first, value_idx, text_pool, text_start)
+                top -= 1
+                continue
+            elif r == R_VAR:
+                n = _put_fragment(out, n, F_VAR, frag_pool, frag_start)
+                n = _put_value(out, n, node, value_idx, text_pool, text_start)
+            elif r == R_IF:
+                n = _put_fragment(out, n, F_IF, frag_pool, frag_start)
+            elif r == R_WHILE:
+                n = _put_fragment(out, n, F_WHILE, frag_pool, frag_start)
+            elif r == R_BREAK:
+                n = _put_fragment(out, n, F_BREAK, frag_pool, frag_start)
+            elif r == R_CONTINUE:
+                n = _put_fragment(out, n, F_CONTINUE, frag_pool, frag_start)
+            elif r == R_COMPOUND:
+                n = _put_fragment(out, n, F_LBRACE, frag_pool, frag_start)
+            elif r == R_FNDECL:
+                n = _put_fragment(out, n, F_FUNC, frag_pool, frag_start)
+                n = _put_value(out, n, node, value_idx, text_pool, text_start)
+                n = _put_fragment(out, n, F_PARAMS, frag_pool, frag_start)
+            elif r == R_FNRETURN:
+                n = _put_fragment(out, n, F_RETURN, frag_pool, frag_start)
+            child = left[node]
+            pos = 0
+        else:
+            # Back from a child: close what was opened for it
+            if r == R_BINOP or r == R_RELOP:
+                if _grouped(child, node_prec[node], r == R_RELOP or pos == 1, role, node_prec):
+                    n = _put_fragment(out, n, F_RPAREN, frag_pool, frag_start)
+            elif r == R_UNARY:
+                if _grouped(child, _UNARY_PRECEDENCE, True, role, node_prec):
+                    n = _put_fragment(out, n, F_RPAREN, frag_pool, frag_start)
+            elif r == R_IF and pos >= 1:
+                n = _put_fragment(out, n, F_CLOSE, frag_pool, frag_start)
+            child = right[child]
+            pos += 1
+
+        if child >= 0:
+            # Everything that comes before the next child
+            if r == R_BINOP or r == R_RELOP:
+                if pos == 1:
+                    n = _put_fragment(out, n, F_SPACE, frag_pool, frag_start)
+                    n = _put_value(out, n, node, value_idx, text_pool, text_start)
+                    n = _put_fragment(out, n, F_SPACE, frag_pool, frag_start)
+                if _grouped(child, node_prec[node], r == R_RELOP or pos == 1, role, node_prec):
+                    n = _put_fragment(out, n, F_LPAREN, frag_pool, frag_start)
+            elif r == R_UNARY:
+                if _grouped(child, _UNARY_PRECEDENCE, True, role, node_prec):
+                    n = _put_fragment(out, n, F_LPAREN, frag_pool, frag_start)
+            elif r == R_ASSIGN and pos == 1:
+                n = _put_fragment(out, n, F_EQUALS, frag_pool, frag_start)
+            elif r == R_CONST or r == R_VAR:
+                if role[child] == R_TYPE:
+                    n = _put_fragment(out, n, F_SPACE, frag_pool, frag_start)
+                else:
+                    n = _put_fragment(out, n, F_EQUALS, frag_pool, frag_start)
+            elif r == R_IF:
+                if pos == 1:
+                    n = _put_fragment(out, n, F_OPEN, frag_pool, frag_start)
+                elif pos == 2:
+                    n = _put_fragment(out, n, F_ELSE, frag_pool, frag_start)
+            elif r == R_WHILE and pos == 1:
+                n = _put_fragment(out, n, F_OPEN, frag_pool, frag_start)
+            elif r == R_BLOCK and pos > 0:
+                n = _put_fragment(out, n, F_NEWLINE, frag_pool, frag_start)
+            elif r == R_COMPOUND and pos > 0:
+                n = _put_fragment(out, n, F_SPACE, frag_pool, frag_start)
+            elif r == R_FNPARAMS and pos > 0:
+                n = _put_fragment(out, n, F_COMMA, frag_pool, frag_start)
+            elif r == R_FNDECL:
+                if role[child] == R_FNPARAM:
+                    if pos > 0:
+                        n = _put_fragment(out, n, F_COMMA_SPACE, frag_pool, frag_start)
+                elif role[child] == R_TYPE:
+                    n = _put_fragment(out, n, F_END_PARAMS, frag_pool, frag_start)
+                else:
+                    n = _put_fragment(out, n, F_OPEN, frag_pool, frag_start)
+            stack_child[top] = child
+            stack_pos[top] = pos
+            top += 1
+            stack_node[top] = child
+            stack_child[top] = -1
+            stack_pos[top] = -1
+        else:
+            # Leaving the node
+            if r == R_EXPR or r == R_PRINT or r == R_CONST or r == R_VAR:
+                n = _put_fragment(out, n, F_SEMI, frag_pool, frag_start)
+            elif r == R_GROUPED:
+                n = _put_fragment(out, n, F_RPAREN, frag_pool, frag_start)
+            elif r == R_WHILE:
+                n = _put_fragment(out, n, F_CLOSE, frag_pool, frag_start)
+            elif r == R_COMPOUND:
+                n = _put_fragment(out, n, F_RBRACE, frag_pool, frag_start)
+            elif r == R_FNDECL:
+                n = _put_fragment(out, n, F_END_FUNC, frag_pool, frag_start)
+            elif r == R_FNRETURN:
+                n = _put_fragment(out, n, F_END_RETURN, frag_pool, frag_start)
+            top -= 1
+    return n
+
+
+if njit is not None:
+    _put = njit(cache=True)(_put)
+    _put_fragment = njit(cache=True)(_put_fragment)
+    _put_value = njit(cache=True)(_put_value)
+    _grouped = njit(cache=True)(_grouped)
+    _emit = njit(cache=True)(_emit)
+
+
+# Text pieces packed end to end into one byte pool, with the offset
+# where each one starts (and, one past the last, where the pool ends)
+def _pack(texts):
+    if np is not None:
+        pool = ''.join(texts).encode('utf-8')
+        # In ASCII text a character is one byte, so the lengths of the
+        # texts themselves give the offsets; otherwise encode each one
+        if len(pool) == sum(map(len, texts)):
+            lengths = map(len, texts)
+        else:
+            lengths = (len(text.encode('utf-8')) for text in texts)
+        starts = np.zeros(len(texts) + 1, np.int64)
+        np.cumsum(np.fromiter(lengths, np.int64, len(texts)), out=starts[1:])
+        return np.frombuffer(pool, np.uint8), starts
+    encoded = [text.encode('utf-8') for text in texts]
+    pool = b''.join(encoded)
+    starts = [0]
+    for data in encoded:
+        starts.append(starts[-1] + len(data))
+    return pool, starts
+
+
+def _text(value):
+    if type(value) in (str, int, float):
+        return str(value)
+    # A parameter's VarDeclaration is named by a Name node
+    return str(getattr(value, 'value', value))
+
+
+_frag_pool, _frag_start = _pack(_FRAGMENTS)
+
+
+def to_source(flat):
+    '''
+    The source of a flattened model (a FlatAST), the same as to_source()
+    gives for the model itself.
+    '''
+    roles_by_kind = [_roles.get(cls.__name__, R_OTHER) for cls in flat.classes]
+    for kind, r in enumerate(roles_by_kind):
+        if r == R_OTHER and kind in flat.kind:
+            raise RuntimeError(f"Can't convert {flat.classes[kind].__name__} to source")
+    texts = [value if type(value) is str else _text(value) for value in flat.values]
+    text_pool, text_start = _pack(texts)
+    # One more entry on the end, where the -1 of a node without a value
+    # lands
+    value_prec = [_precedence.get(text, 0) for text in texts] + [0]
+
+    # No node writes more than a few fixed pieces around its own text
+    size = len(text_pool) + 40 * len(flat) + 1
+    depth = flat.depth + 1
+    if np is not None:
+        role = np.array(roles_by_kind, np.int8)[flat.kind]
+        node_prec = np.array(value_prec, np.int8)[flat.value_idx]
+        out = np.zeros(size, np.uint8)
+        stacks = [np.empty(depth, np.int32) for _ in range(3)]
+    else:
+        role = [roles_by_kind[kind] for kind in flat.kind]
+        node_prec = [value_prec[v] for v in flat.value_idx]
+        out = bytearray(size)
+        stacks = [[0] * depth for _ in range(3)]
+    n = _emit(role, flat.left, flat.right, flat.value_idx, node_prec,
+              text_pool, text_start, _frag_pool, _frag_start, out, *stacks)
+    return bytes(out[:n]).decode('utf-8')